@@ -0,0 +1,73 @@
+"""
+Shared setup for the benchmark scripts.
+
+Benchmarks run against the MongoDB named by DATABASE_URL / DATABASE_NAME when
+both are set (use a throwaway database: collections are dropped and reseeded),
+and against mongomock-motor otherwise. In-memory numbers are only useful for
+comparing code paths against each other, not as absolute latencies.
+"""
+
+import os
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import numpy as np
+
+import database
+
+
+def in_memory() -> bool:
+    return not (os.getenv("DATABASE_URL") and os.getenv("DATABASE_NAME"))
+
+
+def connect() -> str:
+    """Install a database handle as `database.db`; returns a label for reports"""
+    if not in_memory():
+        database.connect()
+        return f"mongodb ({os.getenv('DATABASE_NAME')})"
+    from mongomock_motor import AsyncMongoMockClient
+
+    database.db = AsyncMongoMockClient()["bench"]
+    return "mongomock-motor (in-memory)"
+
+
+class CountingDatabase:
+    """Wraps a Motor database and counts the operations that reach the server"""
+
+    OPERATIONS = ("find", "find_one", "aggregate", "count_documents", "bulk_write", "update_one", "insert_many")
+
+    def __init__(self, db):
+        self._db = db
+        self.calls = 0
+
+    def __getitem__(self, name):
+        return _CountingCollection(self, self._db[name])
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+class _CountingCollection:
+    def __init__(self, owner: CountingDatabase, collection):
+        self._owner = owner
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name in CountingDatabase.OPERATIONS:
+            def counted(*args, **kwargs):
+                self._owner.calls += 1
+                return attr(*args, **kwargs)
+            return counted
+        return attr
+
+
+async def timed(fn: Callable[[], Awaitable], repeat: int) -> Dict[str, float]:
+    """Run fn repeat times and summarize latencies in milliseconds"""
+    samples: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    ms = np.array(samples)
+    return {"p50_ms": float(np.percentile(ms, 50)), "p99_ms": float(np.percentile(ms, 99)), "mean_ms": float(ms.mean())}
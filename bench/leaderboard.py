@@ -0,0 +1,69 @@
+"""
+/leaderboard username hydration: one `$in` fetch versus a lookup per row.
+
+    python -m bench.leaderboard [--users N] [--repeat N]
+
+For each limit (50, 500, 5000) reports the database round trips per request
+and p50/p99 latency of the current path (leaderboards.top + hydrate_usernames)
+next to the per-row lookup it replaced. mongomock scans the user collection
+for every lookup, so in memory the defaults are small (1000 users, 3 repeats,
+so limit=5000 reads all 1000 rows); against MongoDB they are 100000 users and
+50 repeats.
+"""
+
+import argparse
+import asyncio
+
+from bson import ObjectId
+
+import database
+import leaderboards
+from bench.common import CountingDatabase, connect, in_memory, timed
+from main import hydrate_usernames
+
+LIMITS = (50, 500, 5000)
+
+
+async def per_row_usernames(rows):
+    """The pre-user-001 path: one find_one per leaderboard row"""
+    for r in rows:
+        u = await database.db["user"].find_one({"_id": ObjectId(r["user_id"])}, {"username": 1})
+        r["username"] = u.get("username") if u else "Unknown"
+    return rows
+
+
+async def seed(n_users: int):
+    for name in ("user", leaderboards.SEASON):
+        await database.db[name].drop()
+    ids = [ObjectId() for _ in range(n_users)]
+    await database.db["user"].insert_many([{"_id": i, "username": f"user{n}"} for n, i in enumerate(ids)])
+    await database.db[leaderboards.SEASON].insert_many([{"user_id": str(i), "points": n % 997} for n, i in enumerate(ids)])
+
+
+async def main(args):
+    label = connect()
+    args.users = args.users or (1000 if in_memory() else 100000)
+    args.repeat = args.repeat or (3 if in_memory() else 50)
+    await seed(args.users)
+    counting = CountingDatabase(database.db)
+    database.db = counting
+    print(f"backend: {label}, users: {args.users}, repeat: {args.repeat}")
+    print(f"{'limit':>6} {'path':>8} {'round trips':>12} {'p50 ms':>9} {'p99 ms':>9}")
+    for limit in LIMITS:
+        for path, hydrate in (("bulk $in", hydrate_usernames), ("per row", per_row_usernames)):
+            counting.calls = 0
+            await hydrate(await leaderboards.top(None, limit))
+            trips = counting.calls
+            stats = await timed(lambda: _request(hydrate, limit), args.repeat)
+            print(f"{limit:>6} {path:>8} {trips:>12} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+
+async def _request(hydrate, limit):
+    await hydrate(await leaderboards.top(None, limit))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=None)
+    asyncio.run(main(parser.parse_args()))
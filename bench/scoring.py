@@ -0,0 +1,83 @@
+"""
+Scoring engine throughput: draft_points over synthetic drafts, then score_week.
+
+    python -m bench.scoring [--drafts 1000000] [--players 200] [--week-drafts N]
+
+draft_points runs in memory, so its number is the same on either backend.
+score_week includes the reads and bulk writes. mongomock scans a collection
+for every update, so in memory it defaults to 2000 drafts and its drafts/s
+says nothing about production; point DATABASE_URL at a scratch database
+(default 1000000 drafts there) for a real figure.
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+import database
+import leaderboards
+import scoring
+from bench.common import connect, in_memory
+
+SQUAD_SIZE = 5
+
+
+def synthetic_roster(n_players: int, rng):
+    stats = np.column_stack([
+        rng.uniform(0, 10, n_players),        # kda
+        rng.integers(0, 100000, n_players),   # damage
+        rng.integers(0, 20, n_players),       # objectives
+        rng.uniform(0, 100, n_players),       # win_rate
+        rng.integers(0, 5, n_players),        # mvp_count
+    ])
+    ids = [f"{i:024x}" for i in range(n_players)]
+    return ids, stats
+
+
+def bench_draft_points(n_drafts: int, n_players: int, rng):
+    ids, stats = synthetic_roster(n_players, rng)
+    index = {pid: i for i, pid in enumerate(ids)}
+    points = np.append(scoring.player_points(stats), 0.0)
+    picks = rng.integers(0, n_players, (n_drafts, SQUAD_SIZE))
+    squads = [[ids[j] for j in row] for row in picks]
+
+    started = time.perf_counter()
+    totals = scoring.draft_points(points, index, squads)
+    elapsed = time.perf_counter() - started
+    assert len(totals) == n_drafts
+    print(f"draft_points: {n_drafts} drafts x {SQUAD_SIZE} players in {elapsed:.2f}s ({n_drafts / elapsed:,.0f} drafts/s)")
+
+
+async def bench_score_week(n_drafts: int, n_players: int, batch_size: int, rng):
+    for name in ("player", "draftteam", leaderboards.WEEKLY, leaderboards.SEASON):
+        await database.db[name].drop()
+    _, stats = synthetic_roster(n_players, rng)
+    result = await database.db["player"].insert_many([dict(zip(scoring.STAT_FIELDS, map(float, row))) for row in stats])
+    ids = [str(i) for i in result.inserted_ids]
+    picks = rng.integers(0, n_players, (n_drafts, SQUAD_SIZE))
+    await database.db["draftteam"].insert_many([
+        {"user_id": f"u{n}", "week": 1, "player_ids": [ids[j] for j in row], "points": 0} for n, row in enumerate(picks)
+    ])
+    summary = await scoring.score_week(1, batch_size=batch_size)
+    print(f"score_week: {summary['updated']}/{summary['drafts']} drafts in {summary['seconds']}s "
+          f"({summary['drafts'] / summary['seconds']:,.0f} drafts/s, batch {batch_size})")
+
+
+async def main(args):
+    rng = np.random.default_rng(0)
+    bench_draft_points(args.drafts, args.players, rng)
+    label = connect()
+    print(f"backend: {label}")
+    week_drafts = args.week_drafts or (2000 if in_memory() else 1000000)
+    await bench_score_week(week_drafts, args.players, args.batch_size, rng)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--drafts", type=int, default=1000000)
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--week-drafts", type=int, default=None, help="Drafts scored by score_week")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    asyncio.run(main(parser.parse_args()))
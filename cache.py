@@ -0,0 +1,117 @@
+"""
+In-process Caches
+
+Small read-through caches for read-heavy endpoints. Entries expire after a TTL
+and are stamped with the cache version at fill time; invalidate() bumps the
+version so every existing entry turns into a miss without scanning the store.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from compression import MIN_SIZE, compress
+
+# All caches by name, so their counters can be reported from one place
+CACHES: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, maxsize: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        CACHES[name] = self
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, version, value = entry
+                if version == self.version and expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, version: Optional[int] = None):
+        """Store value under key; pass the version read before loading to drop racing fills"""
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, self.version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every entry by bumping the version"""
+        with self._lock:
+            self.version += 1
+            self.invalidations += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class CachedBody:
+    """A serialized response body with its ETag and lazily built compressed variants.
+
+    Each encoding is compressed at most once per entry, so repeated hits on a
+    cached response cost no compression CPU.
+    """
+
+    __slots__ = ("body", "etag", "_encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        # Weak: gzip/br variants of the same body are semantically equivalent
+        self.etag = 'W/"%s"' % hashlib.sha1(body).hexdigest()
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> Optional[bytes]:
+        """The body compressed with encoding, or None if it isn't worth compressing"""
+        if encoding is None or len(self.body) < MIN_SIZE:
+            return None
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = compress(self.body, encoding, best=True)
+        return data
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
@@ -0,0 +1,146 @@
+"""
+Response Compression
+
+ASGI middleware that gzip- or brotli-encodes responses above a size threshold.
+Brotli is used when the optional `brotli` package is installed and the client
+accepts it. Streaming responses are compressed chunk by chunk and flushed as
+they go, so NDJSON lines still arrive promptly. Responses that already carry a
+Content-Encoding (e.g. pre-compressed cache entries) are passed through as is.
+
+    COMPRESSION_MIN_SIZE   smallest body in bytes worth compressing (default 1024)
+"""
+
+import gzip
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str, best: bool = False) -> bytes:
+    """One-shot compression; best=True trades CPU for size when the result is cached"""
+    if encoding == "br":
+        return brotli.compress(data, quality=9 if best else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+def compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class _StreamEncoder:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._c.finish()
+        return self._c.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        mode = None  # "plain" or "stream" once the first body message is seen
+        encoder = None
+
+        async def wrapped_send(message):
+            nonlocal start, mode, encoder
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if mode is None:
+                headers = MutableHeaders(raw=start["headers"])
+                if (
+                    "content-encoding" in headers
+                    or not compressible(headers.get("content-type"))
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    mode = "plain"
+                    await send(start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    body = compress(body, encoding)
+                    headers["Content-Length"] = str(len(body))
+                    mode = "plain"
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["Content-Length"]
+                mode = "stream"
+                encoder = _StreamEncoder(encoding)
+                await send(start)
+
+            if mode == "plain":
+                await send(message)
+                return
+            data = encoder.chunk(body)
+            if not more_body:
+                data += encoder.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, wrapped_send)
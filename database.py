@@ -1,15 +1,31 @@
 """
 Database Helper Functions
 
-MongoDB helper functions ready to use in your backend code.
-Import and use these functions in your API endpoints for database operations.
+Async MongoDB (Motor) helper functions ready to use in your backend code.
+Import and await these functions in your API endpoints for database operations.
+
+The client is opened by connect() and closed by close(), which the FastAPI
+lifespan calls, so always reach the handle as `database.db` rather than
+importing `db` by name. Pool sizing and timeouts come from the environment:
+
+    MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_CONNECT_TIMEOUT_MS, MONGO_COMPRESSORS (e.g. "zstd,zlib")
+
+MONGO_STARTUP_PING_MS (default 2000) bounds the reachability check the app
+runs at startup.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
 from datetime import datetime, timezone
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Sequence, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -21,12 +37,154 @@ db = None
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
-if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+_INT_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": "waitQueueTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+}
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters fed by PyMongo's CMAP monitoring events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiting_since = {}
+        self.open_connections = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.wait_queue = 0
+        self.max_wait_queue = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.pool_clears = 0
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._waiting_since[threading.get_ident()] = time.perf_counter()
+            self.wait_queue += 1
+            self.max_wait_queue = max(self.max_wait_queue, self.wait_queue)
+
+    def _end_wait(self):
+        started = self._waiting_since.pop(threading.get_ident(), None)
+        self.wait_queue = max(self.wait_queue - 1, 0)
+        if started is not None:
+            waited = time.perf_counter() - started
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self._end_wait()
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self._end_wait()
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(self.open_connections - 1, 0)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            completed = self.checkouts + self.checkout_failures
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "wait_queue": self.wait_queue,
+                "max_wait_queue": self.max_wait_queue,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_wait_ms": (self.wait_time_total / completed * 1000) if completed else 0.0,
+                "max_wait_ms": self.wait_time_max * 1000,
+                "pool_clears": self.pool_clears,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+def client_options() -> dict:
+    """MongoClient keyword options taken from the environment"""
+    options = {}
+    for env_name, option in _INT_OPTIONS.items():
+        value = os.getenv(env_name)
+        if value:
+            options[option] = int(value)
+    compressors = os.getenv("MONGO_COMPRESSORS")
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+def connect():
+    """Open the shared client if configured; safe to call more than once"""
+    global _client, db
+    if _client is None and database_url and database_name:
+        _client = AsyncIOMotorClient(database_url, event_listeners=[pool_metrics], **client_options())
+        db = _client[database_name]
+    return db
+
+
+async def ping(timeout: float) -> bool:
+    """True if the server answers a ping within timeout seconds.
+
+    Bounded by asyncio rather than serverSelectionTimeoutMS, so an unreachable
+    server costs `timeout` instead of the full selection timeout.
+    """
+    if db is None:
+        return False
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout)
+        return True
+    except (asyncio.TimeoutError, PyMongoError):
+        return False
+
+
+def close():
+    """Close the shared client and release its pool"""
+    global _client, db
+    if _client is not None:
+        _client.close()
+    _client = None
+    db = None
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,16 +198,132 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, documents: List[dict], batch_size: int = 1000) -> int:
+    """Insert many documents with timestamps in unordered batches; returns the number inserted"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    now = datetime.now(timezone.utc)
+    inserted = 0
+    for start in range(0, len(documents), batch_size):
+        batch = [{**d, "created_at": now, "updated_at": now} for d in documents[start:start + batch_size]]
+        result = await db[collection_name].insert_many(batch, ordered=False)
+        inserted += len(result.inserted_ids)
+    return inserted
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None, sort: list = None):
+    """Get documents from collection, optionally projected and sorted"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = db[collection_name].find(filter_dict or {}, projection)
+    if sort:
+        cursor = cursor.sort(sort)
     if limit:
         cursor = cursor.limit(limit)
     
-    return list(cursor)
+    return await cursor.to_list(None)
+
+async def find_one(collection_name: str, filter_dict: dict, projection: dict = None, sort: list = None):
+    """Get a single document, optionally projected and sorted"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    return await db[collection_name].find_one(filter_dict, projection, sort=sort)
+
+
+async def bulk_upsert(collection_name: str, rows: List[dict], key_fields: Sequence[str], defaults: dict = None) -> dict:
+    """Upsert rows matched on key_fields with one unordered bulk_write.
+
+    Only the fields present in a row are `$set`, so a partial row never resets
+    stored values; `defaults` fill fields a row leaves out when it inserts.
+    Returns counts plus per-row errors as {"index": position in rows, "error": message}.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    result = {"matched": 0, "modified": 0, "upserted": 0, "errors": []}
+    if not rows:
+        return result
+    now = datetime.now(timezone.utc)
+    ops = []
+    for row in rows:
+        fields = {k: v for k, v in row.items() if k != "created_at"}
+        fields["updated_at"] = now
+        on_insert = {k: v for k, v in (defaults or {}).items() if k not in fields}
+        on_insert["created_at"] = now
+        ops.append(UpdateOne(
+            {k: row[k] for k in key_fields},
+            {"$set": fields, "$setOnInsert": on_insert},
+            upsert=True,
+        ))
+    try:
+        r = await db[collection_name].bulk_write(ops, ordered=False)
+        details = r.bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+        result["errors"] = [{"index": err["index"], "error": err.get("errmsg", "write error")} for err in details.get("writeErrors", [])]
+    result["matched"] = details.get("nMatched", 0)
+    result["modified"] = details.get("nModified", 0)
+    result["upserted"] = details.get("nUpserted", 0)
+    return result
+
+
+async def get_page(collection_name: str, filter_dict: dict = None, limit: int = 100, after=None, projection: dict = None):
+    """Get one keyset page ordered by _id; returns (documents, last _id or None when exhausted)"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    query = dict(filter_dict or {})
+    if after is not None:
+        query["_id"] = {"$gt": after}
+    if projection:
+        projection = {**projection, "_id": 1}
+    docs = await db[collection_name].find(query, projection).sort("_id", 1).limit(limit).to_list(None)
+    next_after = docs[-1]["_id"] if len(docs) == limit else None
+    return docs, next_after
+
+async def iter_documents(collection_name: str, filter_dict: dict = None, batch_size: int = 500, projection: dict = None):
+    """Yield documents in _id order straight from the cursor, one batch in memory at a time"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    cursor = db[collection_name].find(filter_dict or {}, projection).sort("_id", 1).batch_size(batch_size)
+    async for doc in cursor:
+        yield doc
+
+
+# Index management
+async def ensure_indexes(indexes: dict) -> dict:
+    """Create declared indexes idempotently; returns {collection: error} for failures"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    errors = {}
+    for collection_name, specs in indexes.items():
+        models = [IndexModel(keys, **options) for keys, options in specs]
+        try:
+            await db[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            errors[collection_name] = str(e)
+    return errors
+
+async def index_report(indexes: dict) -> dict:
+    """Compare declared indexes with the server: {collection: {"missing": [...], "extra": [...]}}"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    report = {}
+    for collection_name, specs in indexes.items():
+        existing = await db[collection_name].index_information()
+        existing.pop("_id_", None)
+        actual = {(tuple(tuple(k) for k in info["key"]), bool(info.get("unique"))): name for name, info in existing.items()}
+        declared = {(tuple((f, d) for f, d in keys), bool(options.get("unique"))): options["name"] for keys, options in specs}
+        report[collection_name] = {
+            "missing": sorted(name for key, name in declared.items() if key not in actual),
+            "extra": sorted(name for key, name in actual.items() if key not in declared),
+        }
+    return report
@@ -0,0 +1,141 @@
+"""
+Bulk Record Parsing
+
+Turns an uploaded request body into (row_number, record) pairs. JSON arrays are
+parsed whole; NDJSON and CSV are parsed line by line while the body streams in,
+so a full roster import never has to be buffered as text. CSV records may span
+lines inside quoted fields. Bodies are UTF-8, optionally with a BOM; a row
+with invalid bytes is reported as a RecordError like any other bad row.
+"""
+
+import csv
+import json
+from collections import deque
+from typing import AsyncIterator, List, Tuple
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+# A quoted CSV field still open after this many lines fails the whole import
+MAX_RECORD_LINES = 100
+
+
+class RecordError(ValueError):
+    """A row that could not be decoded into a record"""
+
+    def __init__(self, row: int, message: str):
+        super().__init__(message)
+        self.row = row
+
+
+class _LineFeed:
+    """Line source for one csv.reader, filled as the body streams in"""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self.lines:
+            return self.lines.popleft()
+        raise StopIteration
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[str, bool]]:
+    """Yield (line, valid_utf8) with line endings kept.
+
+    The body is split on b"\n" before decoding, which is safe for UTF-8, so an
+    invalid byte only spoils its own line. A leading BOM is dropped, and
+    undecodable bytes are replaced so the rest of the line can still be read.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for line in complete:
+            yield _decode(line + b"\n")
+    if pending:
+        yield _decode(pending)
+
+
+def _decode(raw: bytes) -> Tuple[str, bool]:
+    try:
+        return raw.decode("utf-8-sig"), True
+    except UnicodeDecodeError:
+        return raw.decode("utf-8-sig", errors="replace"), False
+
+
+async def iter_records(content_type: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (row_number, record) pairs, or (row_number, RecordError) for undecodable rows"""
+    media_type = (content_type or "application/json").split(";")[0].strip().lower()
+
+    if media_type in NDJSON_TYPES:
+        row = 0
+        async for line, valid in _lines(chunks):
+            if not line.strip():
+                continue
+            row += 1
+            if not valid:
+                yield row, RecordError(row, "Invalid UTF-8")
+                continue
+            try:
+                yield row, json.loads(line)
+            except ValueError as e:
+                yield row, RecordError(row, f"Invalid JSON: {e}")
+        return
+
+    if media_type in CSV_TYPES:
+        # One strict reader parses the whole body, so quoted fields may span
+        # lines. A record's lines are only handed over once the reader can
+        # finish it; until then they are kept and offered again with the next.
+        feed = _LineFeed()
+        reader = csv.reader(feed, strict=True)
+        header = None
+        row = 0
+        record: List[str] = []
+        record_valid = True
+        async for line, valid in _lines(chunks):
+            if not record and not line.strip():
+                continue
+            record.append(line)
+            record_valid = record_valid and valid
+            feed.lines.extend(record)
+            try:
+                values = next(reader)
+                error = None
+            except csv.Error as e:
+                if str(e) == "unexpected end of data":
+                    if len(record) >= MAX_RECORD_LINES:
+                        raise RecordError(row + 1, f"Row {row + 1}: quoted field spans more than {MAX_RECORD_LINES} lines")
+                    continue
+                values, error = None, f"Invalid CSV: {e}"
+            feed.lines.clear()
+            ok, record, record_valid = record_valid, [], True
+            if header is None:
+                if error or not ok:
+                    raise RecordError(0, error or "Header row is not valid UTF-8")
+                header = [h.strip() for h in values]
+                continue
+            row += 1
+            if error or not ok:
+                yield row, RecordError(row, error or "Invalid UTF-8")
+                continue
+            if len(values) != len(header):
+                yield row, RecordError(row, f"Expected {len(header)} columns, got {len(values)}")
+                continue
+            # Empty cells mean "not provided", so the stored value is left unchanged
+            yield row, {k: v for k, v in zip(header, values) if v != ""}
+        if record:
+            yield row + 1, RecordError(row + 1, "Unterminated quoted field")
+        return
+
+    body = b"".join([chunk async for chunk in chunks])
+    try:
+        records = json.loads(body or b"[]")
+    except ValueError as e:
+        raise RecordError(0, f"Invalid JSON: {e}")
+    if not isinstance(records, list):
+        raise RecordError(0, "Expected a JSON array of records")
+    for row, record in enumerate(records, start=1):
+        yield row, record
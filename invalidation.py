@@ -0,0 +1,161 @@
+"""
+Cross-worker Cache Invalidation
+
+Each uvicorn worker runs one background task that tails a MongoDB change stream
+on the collections backing in-process caches and calls the handlers registered
+for each collection, so a write handled by one worker refreshes every worker.
+Events are coalesced into bursts: whatever arrives within WATCHER_DEBOUNCE_MS
+of the previous event runs each affected collection's handlers once, so a bulk
+import of R rows costs one refresh instead of R. The resume token is persisted
+in `watcher_state` once per burst, so a restarted watcher picks up where it
+stopped instead of flushing every cache.
+If the token has aged out of the oplog, all handlers run once as a full flush.
+
+Change streams need a replica set; a single-node one is enough locally. On a
+standalone server the watcher logs a warning and stays off.
+
+    WATCHER_ID           key for the persisted resume token (default: hostname)
+    WATCHER_DEBOUNCE_MS  quiet time that ends a burst (default: 200)
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+import database
+
+logger = logging.getLogger(__name__)
+
+STATE_COLLECTION = "watcher_state"
+WATCHER_ID = os.getenv("WATCHER_ID") or socket.gethostname()
+RETRY_SECONDS = 5
+DEBOUNCE_MS = int(os.getenv("WATCHER_DEBOUNCE_MS", "200"))
+# Cap on events folded into one burst, so a steady write stream still refreshes
+MAX_BURST = 10000
+# Server error codes: change streams unsupported / resume point no longer in the oplog
+_UNSUPPORTED = {40573}
+_HISTORY_LOST = {280, 286}
+
+Handler = Callable[[Optional[dict]], Union[None, Awaitable[None]]]
+_handlers: Dict[str, List[Handler]] = {}
+
+_stats = {
+    "running": False,
+    "events": 0,
+    "bursts": 0,
+    "handler_errors": 0,
+    "stream_errors": 0,
+    "full_flushes": 0,
+    "last_lag_ms": None,
+    "max_lag_ms": None,
+    "last_event_at": None,
+}
+
+
+def on_change(collection_name: str, handler: Handler):
+    """Register handler(change) for writes to collection_name; change is None on a full flush"""
+    _handlers.setdefault(collection_name, []).append(handler)
+
+
+async def _call(handler: Handler, change: Optional[dict]):
+    try:
+        result = handler(change)
+        if inspect.isawaitable(result):
+            await result
+    except Exception:
+        _stats["handler_errors"] += 1
+        logger.exception("Invalidation handler failed")
+
+
+def _lag_ms(change: dict) -> float:
+    wall_time = change.get("wallTime")
+    if wall_time is not None:
+        return (datetime.now(timezone.utc) - wall_time.replace(tzinfo=timezone.utc)).total_seconds() * 1000
+    return (time.time() - change["clusterTime"].time) * 1000
+
+
+async def _flush_all():
+    _stats["full_flushes"] += 1
+    for handlers in _handlers.values():
+        for handler in handlers:
+            await _call(handler, None)
+
+
+def _record(change: dict):
+    lag = _lag_ms(change)
+    _stats["events"] += 1
+    _stats["last_lag_ms"] = round(lag, 1)
+    _stats["max_lag_ms"] = round(max(lag, _stats["max_lag_ms"] or 0), 1)
+    _stats["last_event_at"] = datetime.now(timezone.utc).isoformat()
+
+
+async def _watch_once():
+    state = database.db[STATE_COLLECTION]
+    saved = await state.find_one({"_id": WATCHER_ID})
+    pipeline = [{"$match": {"ns.coll": {"$in": list(_handlers)}}}]
+    # max_await_time_ms bounds how long try_next() waits for a follow-up event,
+    # which makes it the debounce window.
+    async with database.db.watch(
+        pipeline, resume_after=saved and saved.get("resume_token"), max_await_time_ms=DEBOUNCE_MS
+    ) as stream:
+        _stats["running"] = True
+        while True:
+            change = await stream.next()
+            # Latest event per collection; handlers run once per burst
+            burst: Dict[str, dict] = {}
+            size = 0
+            while change is not None:
+                _record(change)
+                burst[change["ns"]["coll"]] = change
+                size += 1
+                if size >= MAX_BURST:
+                    break
+                change = await stream.try_next()
+            _stats["bursts"] += 1
+            for collection_name, last in burst.items():
+                for handler in _handlers.get(collection_name, []):
+                    await _call(handler, last)
+            await state.update_one(
+                {"_id": WATCHER_ID},
+                {"$set": {"resume_token": stream.resume_token, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True,
+            )
+
+
+async def run():
+    """Watch until cancelled, retrying on transient errors"""
+    if not _handlers:
+        return
+    try:
+        while True:
+            try:
+                await _watch_once()
+            except OperationFailure as e:
+                _stats["stream_errors"] += 1
+                if e.code in _UNSUPPORTED:
+                    logger.warning("Change streams unavailable (%s); cross-worker invalidation is off", e)
+                    return
+                if e.code in _HISTORY_LOST:
+                    logger.warning("Resume token expired; flushing all caches")
+                    await database.db[STATE_COLLECTION].delete_one({"_id": WATCHER_ID})
+                    await _flush_all()
+                    continue
+                logger.warning("Change stream failed: %s", e)
+            except PyMongoError as e:
+                _stats["stream_errors"] += 1
+                logger.warning("Change stream failed: %s", e)
+            _stats["running"] = False
+            await asyncio.sleep(RETRY_SECONDS)
+    finally:
+        _stats["running"] = False
+
+
+def stats() -> dict:
+    return {**_stats, "collections": sorted(_handlers)}
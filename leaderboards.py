@@ -0,0 +1,176 @@
+"""
+Materialized Leaderboards
+
+`leaderboard_weekly` holds one row per (user_id, week) and `leaderboard_season`
+one row per user_id, each carrying the summed DraftTeam.points. The stores are
+kept in step with `draftteam` by applying point deltas whenever a draft's
+points change, so /leaderboard only has to read a top-N slice. Anything that
+writes DraftTeam.points must go through apply_points_deltas (as score_week
+does), or the boards drift until `manage.py rebuild-leaderboard` is run.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+import database
+
+WEEKLY = "leaderboard_weekly"
+SEASON = "leaderboard_season"
+
+
+def _require_db():
+    if database.db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+
+async def apply_points_deltas(changes: Iterable[Tuple[str, int, int]]):
+    """Apply (user_id, week, delta) changes to the weekly and season stores"""
+    _require_db()
+    weekly = {}
+    season = {}
+    for user_id, week, delta in changes:
+        weekly[(user_id, week)] = weekly.get((user_id, week), 0) + delta
+        season[user_id] = season.get(user_id, 0) + delta
+    if weekly:
+        await database.db[WEEKLY].bulk_write([
+            UpdateOne({"user_id": u, "week": w}, {"$inc": {"points": d}}, upsert=True)
+            for (u, w), d in weekly.items()
+        ], ordered=False)
+    if season:
+        await database.db[SEASON].bulk_write([
+            UpdateOne({"user_id": u}, {"$inc": {"points": d}}, upsert=True)
+            for u, d in season.items()
+        ], ordered=False)
+
+
+async def ensure_entry(user_id: str, week: int):
+    """Make sure a user shows up on the boards even before scoring any points"""
+    await apply_points_deltas([(user_id, week, 0)])
+
+
+async def top(week: Optional[int] = None, limit: int = 50) -> List[dict]:
+    """Read the top `limit` rows for a week, or for the season when week is None"""
+    _require_db()
+    if week is None:
+        cursor = database.db[SEASON].find({}, {"_id": 0, "user_id": 1, "points": 1})
+    else:
+        cursor = database.db[WEEKLY].find({"week": week}, {"_id": 0, "user_id": 1, "points": 1})
+    return await cursor.sort([("points", -1), ("user_id", 1)]).limit(limit).to_list(None)
+
+
+async def for_users(user_ids: List[str], week: Optional[int] = None) -> List[dict]:
+    """Rank just the given users (e.g. a league's members), reading them by user_id.
+
+    Users without a row yet are listed with 0 points; ties share a rank.
+    """
+    _require_db()
+    user_ids = list(dict.fromkeys(user_ids))
+    if week is None:
+        cursor = database.db[SEASON].find({"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "points": 1})
+    else:
+        cursor = database.db[WEEKLY].find({"user_id": {"$in": user_ids}, "week": week}, {"_id": 0, "user_id": 1, "points": 1})
+    points = {r["user_id"]: r["points"] async for r in cursor}
+    rows = sorted(({"user_id": u, "points": points.get(u, 0)} for u in user_ids), key=lambda r: (-r["points"], r["user_id"]))
+    for i, r in enumerate(rows):
+        r["rank"] = rows[i - 1]["rank"] if i and rows[i - 1]["points"] == r["points"] else i + 1
+    return rows
+
+
+async def rank_of(user_id: str, week: Optional[int] = None, k: int = 5) -> Optional[dict]:
+    """A user's rank plus up to k neighbours either side, in board order (points desc, user_id asc).
+
+    Served by counts and range reads on the (week, points, user_id) index
+    instead of materializing the board. `rank` is shared by tied users;
+    `position` is the unique 1-based place on the board.
+    """
+    _require_db()
+    board = database.db[SEASON] if week is None else database.db[WEEKLY]
+    base = {} if week is None else {"week": week}
+    projection = {"_id": 0, "user_id": 1, "points": 1}
+    me = await board.find_one({**base, "user_id": user_id}, projection)
+    if me is None:
+        return None
+    points = me["points"]
+    higher = await board.count_documents({**base, "points": {"$gt": points}})
+    tied_before = await board.count_documents({**base, "points": points, "user_id": {"$lt": user_id}})
+    position = higher + tied_before + 1
+
+    above = await board.find(
+        {**base, "$or": [{"points": {"$gt": points}}, {"points": points, "user_id": {"$lt": user_id}}]}, projection
+    ).sort([("points", 1), ("user_id", -1)]).limit(k).to_list(None)
+    above.reverse()
+    below = await board.find(
+        {**base, "$or": [{"points": {"$lt": points}}, {"points": points, "user_id": {"$gt": user_id}}]}, projection
+    ).sort([("points", -1), ("user_id", 1)]).limit(k).to_list(None)
+    for i, r in enumerate(above):
+        r["position"] = position - len(above) + i
+    for i, r in enumerate(below, start=1):
+        r["position"] = position + i
+    return {**me, "rank": higher + 1, "position": position, "above": above, "below": below}
+
+
+async def live_totals(week: Optional[int] = None) -> dict:
+    """Aggregate points straight from `draftteam`, keyed like the stores"""
+    _require_db()
+    pipeline = []
+    if week is not None:
+        pipeline.append({"$match": {"week": week}})
+    pipeline.append({"$group": {"_id": {"user_id": "$user_id", "week": "$week"}, "points": {"$sum": "$points"}}})
+    totals = {}
+    async for r in database.db["draftteam"].aggregate(pipeline, allowDiskUse=True):
+        totals[(r["_id"]["user_id"], r["_id"]["week"])] = r["points"]
+    return totals
+
+
+async def rebuild():
+    """Recompute both stores from `draftteam`, replacing their contents"""
+    _require_db()
+    await database.db["draftteam"].aggregate([
+        {"$group": {"_id": {"user_id": "$user_id", "week": "$week"}, "points": {"$sum": "$points"}}},
+        {"$project": {"_id": 0, "user_id": "$_id.user_id", "week": "$_id.week", "points": 1}},
+        {"$out": WEEKLY},
+    ], allowDiskUse=True).to_list(None)
+    await database.db["draftteam"].aggregate([
+        {"$group": {"_id": "$user_id", "points": {"$sum": "$points"}}},
+        {"$project": {"_id": 0, "user_id": "$_id", "points": 1}},
+        {"$out": SEASON},
+    ], allowDiskUse=True).to_list(None)
+
+
+async def ensure_built() -> bool:
+    """Build the stores from `draftteam` if both are empty but drafts exist.
+
+    Covers the first start after upgrading a deployment that predates the
+    stores; returns True when a rebuild ran.
+    """
+    _require_db()
+    for name in (WEEKLY, SEASON):
+        if await database.db[name].find_one({}, {"_id": 1}) is not None:
+            return False
+    if await database.db["draftteam"].find_one({}, {"_id": 1}) is None:
+        return False
+    await rebuild()
+    return True
+
+
+async def check_consistency() -> List[dict]:
+    """Diff the stores against the live aggregation and return every mismatch"""
+    expected_weekly = await live_totals()
+    expected_season = {}
+    for (user_id, _week), points in expected_weekly.items():
+        expected_season[user_id] = expected_season.get(user_id, 0) + points
+
+    actual_weekly = {(r["user_id"], r["week"]): r["points"] async for r in database.db[WEEKLY].find({}, {"_id": 0})}
+    actual_season = {r["user_id"]: r["points"] async for r in database.db[SEASON].find({}, {"_id": 0})}
+
+    mismatches = []
+    for key in expected_weekly.keys() | actual_weekly.keys():
+        expected, actual = expected_weekly.get(key), actual_weekly.get(key)
+        if expected != actual:
+            mismatches.append({"board": WEEKLY, "user_id": key[0], "week": key[1], "expected": expected, "actual": actual})
+    for key in expected_season.keys() | actual_season.keys():
+        expected, actual = expected_season.get(key), actual_season.get(key)
+        if expected != actual:
+            mismatches.append({"board": SEASON, "user_id": key, "expected": expected, "actual": actual})
+    return mismatches
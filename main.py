@@ -1,17 +1,80 @@
 import os
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import AsyncIterator, Callable, List, Literal, Optional
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, ValidationError
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
 from bson import ObjectId
 
-from database import db, create_document, get_documents
-from schemas import User as UserSchema, Player as PlayerSchema, DraftTeam as DraftTeamSchema, League as LeagueSchema, Transfer as TransferSchema, Notification as NotificationSchema, Matchweek as MatchweekSchema
-
-app = FastAPI(title="MLBB Fantasy League API", version="0.1.0")
-
+import database
+from database import bulk_upsert, create_document, create_documents, find_one, get_documents, get_page, iter_documents
+import leaderboards
+from cache import CACHES, CachedBody, TTLCache, etag_matches
+from compression import CompressionMiddleware, negotiate
+from ingest import RecordError, iter_records
+from player_table import player_table
+import invalidation
+from matchweeks import calendar
+import recommender
+import security
+import tokens
+from serialization import ORJSONResponse, dumps, with_public_id
+from schemas import INDEXES, User as UserSchema, Player as PlayerSchema, DraftTeam as DraftTeamSchema, League as LeagueSchema, Transfer as TransferSchema, Notification as NotificationSchema, Matchweek as MatchweekSchema
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.connect()
+    watcher = None
+    # An unreachable database is logged, not fatal: the app still boots and
+    # reports the problem through /test, as it did before the lifespan existed.
+    # One short ping decides up front, so each startup step below doesn't wait
+    # out the full server selection timeout on its own.
+    if database.db is not None and not await database.ping(int(os.getenv("MONGO_STARTUP_PING_MS", "2000")) / 1000):
+        logger.warning("MongoDB is unreachable; skipping index creation and startup loads")
+        # The periodic refreshes load the player table and calendar once it is back
+        player_table.schedule_reload()
+        calendar.schedule_reload()
+    elif database.db is not None:
+        if os.getenv("ENSURE_INDEXES", "1") == "1":
+            try:
+                for collection_name, error in (await database.ensure_indexes(INDEXES)).items():
+                    logger.warning("Could not create indexes on %s: %s", collection_name, error)
+            except PyMongoError as e:
+                logger.warning("Could not create indexes: %s", e)
+        try:
+            await player_table.load()
+            await calendar.load()
+            if await leaderboards.ensure_built():
+                logger.info("Built the materialized leaderboards from draftteam")
+        except PyMongoError as e:
+            logger.warning("Could not load the player table, matchweek calendar and leaderboards: %s", e)
+    if database.db is not None and os.getenv("CHANGE_STREAMS", "1") == "1":
+        watcher = asyncio.create_task(invalidation.run())
+    security.start()
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    calendar.close()
+    player_table.close()
+    security.shutdown()
+    database.close()
+
+
+app = FastAPI(title="MLBB Fantasy League API", version="0.1.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -29,17 +92,77 @@ def oid(id_str: str) -> ObjectId:
         raise HTTPException(status_code=400, detail="Invalid id")
 
 
-def with_timestamps(data: dict):
-    now = datetime.now(timezone.utc)
-    data.setdefault("created_at", now)
-    data["updated_at"] = now
-    return data
+# Documents in our own collections were validated by their schema on write, so
+# list endpoints serialize them as stored. STRICT_RESPONSES=1 re-validates every
+# row against the response schema, which is useful when debugging bad data.
+STRICT_RESPONSES = os.getenv("STRICT_RESPONSES") == "1"
+
+
+def ndjson_response(docs: AsyncIterator[dict], encode: Callable[[dict], bytes]) -> StreamingResponse:
+    """Stream documents as newline-delimited JSON while the cursor is read"""
+    async def lines():
+        async for d in docs:
+            yield encode(d) + b"\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def cached_response(request: Request, entry: CachedBody) -> Response:
+    """Serve a cached body with ETag revalidation and its pre-compressed variant"""
+    headers = {"ETag": entry.etag, "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate(request.headers.get("accept-encoding"))
+    encoded = entry.encoded(encoding)
+    if encoded is not None:
+        return Response(content=encoded, media_type="application/json", headers={**headers, "Content-Encoding": encoding})
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def ensure_week_open(week: int):
+    """Reject writes to unknown or locked matchweeks using the in-memory calendar"""
+    if not await calendar.knows(week):
+        raise HTTPException(status_code=400, detail="Unknown matchweek")
+    if calendar.is_locked(week):
+        raise HTTPException(status_code=400, detail="Matchweek is locked")
+
+
+def ensure_roster_valid(week: int, rows):
+    """Apply the week's compiled roster rules to player table rows"""
+    violations = calendar.roster_rules(week).check(rows, player_table.role_codes, player_table.team_codes)
+    if violations:
+        raise HTTPException(status_code=400, detail="; ".join(violations))
+
+
+def page_headers(next_after: Optional[ObjectId]) -> dict:
+    return {"X-Next-Cursor": str(next_after)} if next_after is not None else {}
 
 
-# Auth (mock, no real hashing for prototype)
+async def hydrate_usernames(rows: List[dict]) -> List[dict]:
+    """Attach `username` to rows keyed by `user_id` with a single `$in` fetch.
+
+    Draft user ids are usually stringified ObjectIds, but legacy rows may hold
+    plain string ids, so both forms are looked up and matched back by str().
+    """
+    keys = set()
+    for r in rows:
+        uid = r["user_id"]
+        keys.add(uid)
+        if isinstance(uid, str) and ObjectId.is_valid(uid):
+            keys.add(ObjectId(uid))
+    names = {}
+    if keys:
+        async for u in database.db["user"].find({"_id": {"$in": list(keys)}}, {"username": 1}):
+            names[str(u["_id"])] = u.get("username")
+    for r in rows:
+        r["username"] = names.get(str(r["user_id"])) or "Unknown"
+    return rows
+
+
+# Auth
 class RegisterRequest(BaseModel):
-    username: str
-    email: str
+    # Same constraints as the User schema, so bad input is rejected before hashing
+    username: str = Field(..., min_length=3, max_length=24)
+    email: EmailStr
     password: str
 
 class LoginRequest(BaseModel):
@@ -51,42 +174,208 @@ class AuthResponse(BaseModel):
     username: str
     email: str
     avatar_url: Optional[str] = None
+    token: str
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+async def current_claims(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> dict:
+    """Verify the bearer token in-process; no database round trip"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return tokens.verify(credentials.credentials)
+    except tokens.InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+async def current_user_id(claims: dict = Depends(current_claims)) -> str:
+    return claims["sub"]
+
+async def optional_user_id(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[str]:
+    """Like current_user_id, but anonymous requests get None instead of a 401"""
+    if credentials is None:
+        return None
+    return await current_user_id(await current_claims(credentials))
+
+def require_self(user_id: str, auth_user_id: str):
+    if user_id != auth_user_id:
+        raise HTTPException(status_code=403, detail="Token does not match user_id")
 
 
 @app.post("/auth/register", response_model=AuthResponse)
-def register(req: RegisterRequest):
-    if db["user"].find_one({"email": req.email}):
+async def register(req: RegisterRequest):
+    if await find_one("user", {"email": req.email}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    user = UserSchema(username=req.username, email=req.email, password_hash=await security.hash_password(req.password))
+    try:
+        user_id = await create_document("user", user)
+    except DuplicateKeyError:
+        # A concurrent registration won the race on the unique email index
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = UserSchema(username=req.username, email=req.email, password_hash=req.password)
-    user_id = create_document("user", with_timestamps(user.model_dump()))
-    return AuthResponse(user_id=user_id, username=req.username, email=req.email)
+    return AuthResponse(user_id=user_id, username=req.username, email=req.email, token=tokens.issue(user_id))
 
 
 @app.post("/auth/login", response_model=AuthResponse)
-def login(req: LoginRequest):
-    u = db["user"].find_one({"email": req.email, "password_hash": req.password})
-    if not u:
+async def login(req: LoginRequest):
+    u = await find_one("user", {"email": req.email}, {"username": 1, "email": 1, "avatar_url": 1, "password_hash": 1})
+    if not u or not await security.verify_password(req.password, u.get("password_hash", "")):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    return AuthResponse(user_id=str(u["_id"]), username=u["username"], email=u["email"], avatar_url=u.get("avatar_url"))
+    if security.needs_rehash(u["password_hash"]):
+        new_hash = await security.hash_password(req.password)
+        await database.db["user"].update_one({"_id": u["_id"], "password_hash": u["password_hash"]}, {"$set": {"password_hash": new_hash}})
+    return AuthResponse(user_id=str(u["_id"]), username=u["username"], email=u["email"], avatar_url=u.get("avatar_url"), token=tokens.issue(str(u["_id"])))
+
+
+@app.post("/auth/logout")
+async def logout(claims: dict = Depends(current_claims)):
+    tokens.revoke(claims)
+    return {"status": "ok"}
 
 
 # Players
+players_cache = TTLCache("players", ttl=float(os.getenv("PLAYERS_CACHE_TTL", "300")))
+recommendations_cache = TTLCache("recommendations", ttl=float(os.getenv("RECOMMEND_CACHE_TTL", "600")), maxsize=1024)
+_players_adapter = TypeAdapter(List[PlayerSchema])
+PLAYER_FIELDS = tuple(PlayerSchema.model_fields)
+PLAYER_TIMESTAMPS = {"created_at", "updated_at"}
+# Defaults for optional fields, written only when a bulk import inserts a player
+PLAYER_DEFAULTS = {n: f.default for n, f in PlayerSchema.model_fields.items() if not f.is_required() and n not in PLAYER_TIMESTAMPS}
+
+
+def parse_player_fields(fields: Optional[str]) -> Optional[tuple]:
+    if not fields:
+        return None
+    names = tuple(sorted({f.strip() for f in fields.split(",") if f.strip()}))
+    unknown = [f for f in names if f not in PlayerSchema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown player fields: {', '.join(unknown)}")
+    return names
+
+
+def encode_player(d: dict, fields: Optional[tuple]) -> bytes:
+    if fields is None and STRICT_RESPONSES:
+        return PlayerSchema.model_validate(d).model_dump_json().encode()
+    return dumps({f: d[f] for f in fields or PLAYER_FIELDS if f in d})
+
+
+def encode_players(docs: List[dict], fields: Optional[tuple]) -> bytes:
+    if fields is None and STRICT_RESPONSES:
+        return _players_adapter.dump_json(_players_adapter.validate_python(docs))
+    return dumps([{f: d[f] for f in fields or PLAYER_FIELDS if f in d} for d in docs])
+
+
 @app.get("/players", response_model=List[PlayerSchema])
-def list_players(role: Optional[str] = None, team: Optional[str] = None):
+async def list_players(
+    request: Request,
+    role: Optional[str] = None,
+    team: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of player fields, e.g. ign,team,role,cost"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+):
+    selected = parse_player_fields(fields)
+    projection = {f: 1 for f in (selected or PLAYER_FIELDS)}
     q = {}
     if role:
         q["role"] = role
     if team:
         q["team"] = team
-    docs = get_documents("player", q)
-    # Convert _id
-    for d in docs:
-        d.pop("_id", None)
-    return docs
+    if format == "ndjson":
+        if after:
+            q["_id"] = {"$gt": oid(after)}
+        return ndjson_response(iter_documents("player", q, projection=projection), lambda d: encode_player(d, selected))
+    if limit or after:
+        docs, next_after = await get_page("player", q, limit or 100, oid(after) if after else None, projection=projection)
+        return Response(content=encode_players(docs, selected), media_type="application/json", headers=page_headers(next_after))
+
+    key = (role, team, selected)
+    entry = players_cache.get(key)
+    if entry is None:
+        version = players_cache.version
+        docs = await get_documents("player", q, projection={**projection, "_id": 0})
+        entry = CachedBody(encode_players(docs, selected))
+        players_cache.set(key, entry, version)
+    return cached_response(request, entry)
+
+async def refresh_player_caches(change: Optional[dict] = None):
+    players_cache.invalidate()
+    recommendations_cache.invalidate()
+    await player_table.load()
+
+invalidation.on_change("player", refresh_player_caches)
 
 @app.post("/players", response_model=str)
-def seed_player(player: PlayerSchema):
-    return create_document("player", with_timestamps(player.model_dump()))
+async def seed_player(player: PlayerSchema):
+    try:
+        player_id = await create_document("player", player)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A player with this ign already exists")
+    await refresh_player_caches()
+    return player_id
+
+class BulkPlayersResult(BaseModel):
+    received: int
+    upserted: int
+    modified: int
+    matched: int
+    failed: int
+    rows_per_sec: float
+    errors: List[dict] = []
+
+BULK_BATCH_SIZE = int(os.getenv("PLAYERS_BULK_BATCH_SIZE", "500"))
+BULK_MAX_ERRORS = 1000
+
+@app.post("/players/bulk", response_model=BulkPlayersResult)
+async def bulk_upsert_players(request: Request):
+    """Upsert players keyed by `ign` from a JSON array, NDJSON or CSV body.
+
+    Only the fields a row supplies are updated; optional fields it leaves out
+    keep their stored values, or take their defaults on insert. Rows are
+    validated and written in unordered batches; a bad row is reported
+    with its 1-based row number and never blocks the rest of the import.
+    """
+    started = time.perf_counter()
+    totals = {"received": 0, "upserted": 0, "modified": 0, "matched": 0, "failed": 0}
+    errors: List[dict] = []
+
+    def fail(row: int, error: str):
+        totals["failed"] += 1
+        if len(errors) < BULK_MAX_ERRORS:
+            errors.append({"row": row, "error": error})
+
+    async def flush(batch: List[tuple]):
+        result = await bulk_upsert("player", [doc for _, doc in batch], ("ign",), defaults=PLAYER_DEFAULTS)
+        for key in ("upserted", "modified", "matched"):
+            totals[key] += result[key]
+        for err in result["errors"]:
+            fail(batch[err["index"]][0], err["error"])
+
+    batch: List[tuple] = []
+    try:
+        async for row, record in iter_records(request.headers.get("content-type"), request.stream()):
+            totals["received"] += 1
+            if isinstance(record, RecordError):
+                fail(row, str(record))
+                continue
+            try:
+                player = PlayerSchema.model_validate(record)
+            except ValidationError as e:
+                fail(row, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+                continue
+            # Only the fields the row supplied, so a stats-only import keeps photo_url etc.
+            batch.append((row, player.model_dump(exclude_unset=True, exclude=PLAYER_TIMESTAMPS)))
+            if len(batch) >= BULK_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+    except RecordError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await flush(batch)
+
+    if totals["upserted"] or totals["modified"]:
+        await refresh_player_caches()
+    elapsed = time.perf_counter() - started
+    return BulkPlayersResult(**totals, rows_per_sec=round(totals["received"] / elapsed, 1) if elapsed else 0.0, errors=errors)
 
 
 # Draft teams
@@ -97,73 +386,132 @@ class DraftRequest(BaseModel):
     budget: int = 100
 
 @app.post("/draft", response_model=str)
-def create_draft(req: DraftRequest):
-    # compute cost
-    ids = [oid(pid) for pid in req.player_ids]
-    players = list(db["player"].find({"_id": {"$in": ids}}))
-    total_cost = sum(p.get("cost", 0) for p in players)
+async def create_draft(req: DraftRequest, auth_user_id: str = Depends(current_user_id)):
+    require_self(req.user_id, auth_user_id)
+    await ensure_week_open(req.week)
+    rows = await player_table.rows(req.player_ids)
+    if (rows < 0).any():
+        raise HTTPException(status_code=400, detail="Unknown player")
+    ensure_roster_valid(req.week, rows)
+    total_cost = player_table.total_cost(rows)
     if total_cost > req.budget:
         raise HTTPException(status_code=400, detail="Budget exceeded")
     draft = DraftTeamSchema(user_id=req.user_id, week=req.week, budget=req.budget, player_ids=req.player_ids, total_cost=total_cost, points=0)
-    return create_document("draftteam", with_timestamps(draft.model_dump()))
+    # Upsert on the unique (user_id, week) index so a client retry re-drafts
+    # instead of creating a second row; points survive a re-draft.
+    now = datetime.now(timezone.utc)
+    update = {
+        "$set": {**draft.model_dump(include={"budget", "player_ids", "total_cost"}), "updated_at": now},
+        "$setOnInsert": {"points": 0, "created_at": now},
+        "$inc": {"version": 1},
+    }
+    for attempt in range(2):
+        try:
+            d = await database.db["draftteam"].find_one_and_update(
+                {"user_id": req.user_id, "week": req.week}, update,
+                projection={"_id": 1}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            break
+        except DuplicateKeyError:
+            # Lost an insert race with a concurrent upsert; the retry matches its row
+            if attempt:
+                raise
+    await leaderboards.ensure_entry(req.user_id, req.week)
+    return str(d["_id"])
+
+_recommend_inflight: dict = {}
+
+async def _solve_lineup(key: tuple, rules, budget: int, version: int) -> Optional[dict]:
+    # SearchLimitReached propagates and capped results aren't cached, so a
+    # later request searches again
+    result = await recommender.recommend(rules, budget)
+    if result is None or result["optimal"]:
+        recommendations_cache.set(key, result or {}, version)
+    return result
+
+@app.get("/draft/recommend")
+async def recommend_lineup(week: int, budget: int = Query(100, ge=1, le=1000)):
+    """Best projected lineup for a week under budget and the week's roster rules"""
+    if not await calendar.knows(week):
+        raise HTTPException(status_code=400, detail="Unknown matchweek")
+    rules = calendar.roster_rules(week).rules
+    key = (week, budget, rules)
+    result = recommendations_cache.get(key)
+    if result is None:
+        # Single-flight: concurrent misses for the same key share one solve
+        task = _recommend_inflight.get(key)
+        if task is None:
+            task = _recommend_inflight[key] = asyncio.ensure_future(_solve_lineup(key, rules, budget, recommendations_cache.version))
+            task.add_done_callback(lambda _: _recommend_inflight.pop(key, None))
+        try:
+            result = await asyncio.shield(task)
+        except recommender.SearchLimitReached as e:
+            raise HTTPException(status_code=503, detail=f"Lineup search limit reached: {e}")
+    if not result:
+        raise HTTPException(status_code=404, detail="No lineup fits the budget and roster rules")
+    return ORJSONResponse({"week": week, **result})
 
 @app.get("/draft/{user_id}/{week}")
-def get_draft(user_id: str, week: int):
-    d = db["draftteam"].find_one({"user_id": user_id, "week": week})
+async def get_draft(user_id: str, week: int):
+    d = await database.db["draftteam"].find_one({"user_id": user_id, "week": week})
     if not d:
         raise HTTPException(status_code=404, detail="No draft found")
-    d["id"] = str(d.pop("_id"))
-    return d
+    return ORJSONResponse(with_public_id(d))
 
 
-# Leaderboard (simple: sum points per user)
+# Leaderboard (served from the materialized weekly/season stores)
 @app.get("/leaderboard")
-def leaderboard(week: Optional[int] = None, limit: int = 50):
-    pipeline = []
-    if week is not None:
-        pipeline.append({"$match": {"week": week}})
-    pipeline.extend([
-        {"$group": {"_id": "$user_id", "points": {"$sum": "$points"}}},
-        {"$sort": {"points": -1}},
-        {"$limit": limit},
-    ])
-    rows = list(db["draftteam"].aggregate(pipeline))
-    # hydrate usernames
-    for r in rows:
-        u = db["user"].find_one({"_id": oid(r["_id"])}) if ObjectId.is_valid(r["_id"]) else db["user"].find_one({"_id": r["_id"]})
-        r["user_id"] = r.pop("_id")
-        r["username"] = u.get("username") if u else "Unknown"
-    return rows
+async def leaderboard(week: Optional[int] = None, limit: int = Query(50, ge=1, le=500)):
+    return ORJSONResponse(await hydrate_usernames(await leaderboards.top(week, limit)))
+
+@app.get("/leaderboard/rank/{user_id}")
+async def leaderboard_rank(user_id: str, week: Optional[int] = None, k: int = Query(5, ge=0, le=50)):
+    r = await leaderboards.rank_of(user_id, week, k)
+    if r is None:
+        raise HTTPException(status_code=404, detail="User not on leaderboard")
+    await hydrate_usernames([r, *r["above"], *r["below"]])
+    return ORJSONResponse(r)
 
 
 # Leagues
 class CreateLeagueRequest(BaseModel):
     name: str
-    owner_user_id: str
+    # The owner is the token's user; older clients still send it, and it must match
+    owner_user_id: Optional[str] = None
 
 @app.post("/leagues", response_model=str)
-def create_league(req: CreateLeagueRequest):
+async def create_league(req: CreateLeagueRequest, auth_user_id: str = Depends(current_user_id)):
+    if req.owner_user_id is not None:
+        require_self(req.owner_user_id, auth_user_id)
     code = os.urandom(4).hex().upper()
-    league = LeagueSchema(name=req.name, code=code, owner_user_id=req.owner_user_id, member_user_ids=[req.owner_user_id])
-    return create_document("league", with_timestamps(league.model_dump()))
+    league = LeagueSchema(name=req.name, code=code, owner_user_id=auth_user_id, member_user_ids=[auth_user_id])
+    return await create_document("league", league)
 
 @app.post("/leagues/join")
-def join_league(code: str, user_id: str):
-    lg = db["league"].find_one({"code": code})
+async def join_league(code: str, user_id: str, auth_user_id: str = Depends(current_user_id)):
+    require_self(user_id, auth_user_id)
+    lg = await find_one("league", {"code": code}, {"member_user_ids": 1})
     if not lg:
         raise HTTPException(status_code=404, detail="League not found")
     if user_id in lg.get("member_user_ids", []):
         return {"status": "ok"}
-    db["league"].update_one({"_id": lg["_id"]}, {"$addToSet": {"member_user_ids": user_id}})
+    await database.db["league"].update_one({"_id": lg["_id"]}, {"$addToSet": {"member_user_ids": user_id}})
     return {"status": "ok"}
 
+@app.get("/leagues/{league_id}/leaderboard")
+async def league_leaderboard(league_id: str, week: Optional[int] = None):
+    lg = await find_one("league", {"_id": oid(league_id)}, {"member_user_ids": 1})
+    if not lg:
+        raise HTTPException(status_code=404, detail="Not found")
+    rows = await leaderboards.for_users(lg.get("member_user_ids", []), week)
+    return ORJSONResponse(await hydrate_usernames(rows))
+
 @app.get("/leagues/{league_id}")
-def get_league(league_id: str):
-    lg = db["league"].find_one({"_id": oid(league_id)})
+async def get_league(league_id: str):
+    lg = await database.db["league"].find_one({"_id": oid(league_id)})
     if not lg:
         raise HTTPException(status_code=404, detail="Not found")
-    lg["id"] = str(lg.pop("_id"))
-    return lg
+    return ORJSONResponse(with_public_id(lg))
 
 
 # Transfers
@@ -174,59 +522,143 @@ class TransferRequest(BaseModel):
     in_player_id: str
 
 @app.post("/transfer")
-def make_transfer(req: TransferRequest):
-    # simple budget enforcement: recalc cost after swap
-    draft = db["draftteam"].find_one({"user_id": req.user_id, "week": req.week})
+async def make_transfer(req: TransferRequest, auth_user_id: str = Depends(current_user_id)):
+    require_self(req.user_id, auth_user_id)
+    await ensure_week_open(req.week)
+    # Read the squad, validate the swap against the player table and roster
+    # rules, then write with a compare-and-swap on player_ids so a concurrent
+    # transfer can't be silently overwritten.
+    draft = await find_one("draftteam", {"user_id": req.user_id, "week": req.week}, {"player_ids": 1, "budget": 1})
     if not draft:
         raise HTTPException(status_code=404, detail="No draft found")
-    players = list(db["player"].find({"_id": {"$in": [oid(pid) for pid in draft["player_ids"]]}}))
-    cost_map = {str(p["_id"]): p["cost"] for p in players}
-    # replace
-    ids = [pid for pid in draft["player_ids"] if pid != req.out_player_id]
+    current_ids = draft.get("player_ids", [])
+    if req.out_player_id not in current_ids:
+        raise HTTPException(status_code=400, detail="Player not in draft")
+    if req.in_player_id in current_ids:
+        raise HTTPException(status_code=400, detail="Player already in draft")
+    ids = [pid for pid in current_ids if pid != req.out_player_id]
     ids.append(req.in_player_id)
-    new_players = list(db["player"].find({"_id": {"$in": [oid(pid) for pid in ids]}}))
-    new_total = sum(p.get("cost", 0) for p in new_players)
+    rows = await player_table.rows(ids)
+    if (rows < 0).any():
+        raise HTTPException(status_code=400, detail="Unknown player")
+    ensure_roster_valid(req.week, rows)
+    new_total = player_table.total_cost(rows)
     if new_total > draft.get("budget", 100):
         raise HTTPException(status_code=400, detail="Budget exceeded")
-    db["draftteam"].update_one({"_id": draft["_id"]}, {"$set": {"player_ids": ids, "total_cost": new_total, "updated_at": datetime.now(timezone.utc)}})
+    result = await database.db["draftteam"].update_one(
+        {"_id": draft["_id"], "player_ids": current_ids},
+        {"$set": {"player_ids": ids, "total_cost": new_total, "updated_at": datetime.now(timezone.utc)}, "$inc": {"version": 1}},
+    )
+    if not result.modified_count:
+        raise HTTPException(status_code=409, detail="Draft changed by another request, retry the transfer")
     tr = TransferSchema(user_id=req.user_id, week=req.week, out_player_id=req.out_player_id, in_player_id=req.in_player_id, created_at=datetime.now(timezone.utc))
-    create_document("transfer", tr)
+    await create_document("transfer", tr)
     return {"status": "ok"}
 
 
 # Notifications
-@app.get("/notifications", response_model=List[NotificationSchema])
-def list_notifications(limit: int = 20):
-    docs = get_documents("notification", {}, limit)
-    for d in docs:
-        d.pop("_id", None)
-    return docs
+# Global notifications are stored once and merged into every inbox on read
+# (fan-out-on-read); league and user notifications are copied into the
+# recipients' `inbox` rows on write. Both collections are read newest-first by
+# _id, which doubles as the pagination cursor.
+class NotificationOut(NotificationSchema):
+    id: str
+
+NOTIFICATION_FIELDS = {f: 1 for f in NotificationSchema.model_fields}
+_notifications_adapter = TypeAdapter(List[NotificationOut])
+GLOBAL_AUDIENCE = {"audience": {"$in": ["global", None]}}
+
+@app.get("/notifications", response_model=List[NotificationOut])
+async def list_notifications(
+    limit: int = Query(20, ge=1, le=200),
+    before: Optional[str] = Query(None, description="Return notifications older than this id"),
+    since: Optional[str] = Query(None, description="Return notifications newer than this id"),
+    auth_user_id: Optional[str] = Depends(optional_user_id),
+):
+    id_range = {}
+    if before:
+        id_range["$lt"] = oid(before)
+    if since:
+        id_range["$gt"] = oid(since)
+    window = {"_id": id_range} if id_range else {}
+    newest_first = [("_id", -1)]
+
+    docs = await get_documents("notification", {**GLOBAL_AUDIENCE, **window}, limit, projection=NOTIFICATION_FIELDS, sort=newest_first)
+    if auth_user_id is not None:
+        inbox = await get_documents("inbox", {"user_id": auth_user_id, **window}, limit, projection=NOTIFICATION_FIELDS, sort=newest_first)
+        docs = sorted(docs + inbox, key=lambda d: d["_id"], reverse=True)[:limit]
+    headers = page_headers(docs[-1]["_id"] if len(docs) == limit else None)
+    if STRICT_RESPONSES:
+        # NotificationOut.id is a str, so convert before validating
+        docs = [{**d, "id": str(d.pop("_id"))} for d in docs]
+        return Response(content=_notifications_adapter.dump_json(_notifications_adapter.validate_python(docs)), media_type="application/json", headers=headers)
+    return ORJSONResponse([with_public_id(d) for d in docs], headers=headers)
 
 @app.post("/notifications", response_model=str)
-def create_notification(n: NotificationSchema):
-    return create_document("notification", with_timestamps(n.model_dump()))
+async def create_notification(n: NotificationSchema):
+    if n.audience == "user":
+        if not n.user_id:
+            raise HTTPException(status_code=400, detail="user_id is required for user notifications")
+        return await create_document("inbox", n)
+    if n.audience == "league":
+        if not n.league_id:
+            raise HTTPException(status_code=400, detail="league_id is required for league notifications")
+        lg = await find_one("league", {"_id": oid(n.league_id)}, {"member_user_ids": 1})
+        if not lg:
+            raise HTTPException(status_code=404, detail="League not found")
+        notification_id = await create_document("notification", n)
+        base = n.model_dump(exclude={"user_id", "created_at"})
+        await create_documents("inbox", [{**base, "user_id": uid} for uid in lg.get("member_user_ids", [])])
+        return notification_id
+    return await create_document("notification", n.model_copy(update={"user_id": None, "league_id": None}))
 
 
 # Matchweeks
 @app.get("/weeks")
-def list_weeks():
-    docs = get_documents("matchweek", {})
-    for d in docs:
-        d["id"] = str(d.pop("_id"))
-    return docs
+async def list_weeks(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+):
+    if format == "ndjson":
+        q = {"_id": {"$gt": oid(after)}} if after else {}
+        return ndjson_response(iter_documents("matchweek", q), lambda d: dumps(with_public_id(d)))
+    headers = {}
+    if limit or after:
+        docs, next_after = await get_page("matchweek", {}, limit or 100, oid(after) if after else None)
+        headers = page_headers(next_after)
+    else:
+        docs = await get_documents("matchweek", {})
+    return ORJSONResponse([with_public_id(d) for d in docs], headers=headers)
 
 @app.post("/weeks", response_model=str)
-def create_week(w: MatchweekSchema):
-    return create_document("matchweek", with_timestamps(w.model_dump()))
+async def create_week(w: MatchweekSchema):
+    week_id = await create_document("matchweek", w)
+    await calendar.load()
+    return week_id
+
+invalidation.on_change("matchweek", calendar.load)
+
+
+# Metrics
+@app.get("/metrics")
+async def metrics():
+    return {
+        "caches": {name: c.stats() for name, c in CACHES.items()},
+        "player_table": player_table.stats(),
+        "invalidation": invalidation.stats(),
+        "matchweeks": calendar.stats(),
+        "mongo_pool": {**database.pool_metrics.snapshot(), "options": database.client_options()},
+    }
 
 
 # Test
 @app.get("/")
-def root():
+async def root():
     return {"message": "MLBB Fantasy League API running"}
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -236,13 +668,13 @@ def test_database():
         "collections": []
     }
     try:
-        if db is not None:
+        if database.db is not None:
             response["database"] = "✅ Available"
             response["database_url"] = "✅ Configured"
-            response["database_name"] = getattr(db, 'name', '✅ Connected')
+            response["database_name"] = getattr(database.db, 'name', '✅ Connected')
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await database.db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
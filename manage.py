@@ -0,0 +1,195 @@
+"""
+Maintenance Commands
+
+Run from the backend directory with the same DATABASE_URL / DATABASE_NAME
+environment as the API:
+
+    python manage.py rebuild-leaderboard
+    python manage.py check-leaderboard
+    python manage.py ensure-indexes
+    python manage.py index-report
+    python manage.py score-week 3
+    python manage.py dedupe-drafts --dry-run
+    python manage.py validate-drafts 3
+"""
+
+import argparse
+import asyncio
+import sys
+
+import numpy as np
+
+import database
+import leaderboards
+from matchweeks import calendar
+from player_table import player_table
+import scoring
+from schemas import INDEXES
+
+
+async def rebuild_leaderboard(args):
+    await leaderboards.rebuild()
+    print("Leaderboards rebuilt")
+    return 0
+
+
+async def check_leaderboard(args):
+    mismatches = await leaderboards.check_consistency()
+    for m in mismatches[:args.show]:
+        print(m)
+    print(f"{len(mismatches)} mismatches")
+    return 1 if mismatches else 0
+
+
+async def ensure_indexes(args):
+    errors = await database.ensure_indexes(INDEXES)
+    for collection_name, error in errors.items():
+        print(f"{collection_name}: {error}")
+    print("Indexes ensured" if not errors else f"{len(errors)} collections failed")
+    return 1 if errors else 0
+
+
+async def index_report(args):
+    report = await database.index_report(INDEXES)
+    drift = False
+    for collection_name, r in report.items():
+        if r["missing"] or r["extra"]:
+            drift = True
+            print(f"{collection_name}: missing={r['missing']} extra={r['extra']}")
+    print("Indexes match declarations" if not drift else "Index drift found")
+    return 1 if drift else 0
+
+
+async def score_week(args):
+    summary = await scoring.score_week(args.week, batch_size=args.batch_size)
+    print(f"Week {summary['week']}: {summary['updated']}/{summary['drafts']} drafts updated in {summary['seconds']}s")
+    return 0
+
+
+async def dedupe_drafts(args):
+    """Keep the most recently updated draft per (user_id, week) and delete the rest in batches"""
+    duplicates = database.db["draftteam"].aggregate([
+        {"$sort": {"user_id": 1, "week": 1, "updated_at": -1, "_id": -1}},
+        {"$group": {"_id": {"user_id": "$user_id", "week": "$week"}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ], allowDiskUse=True)
+    groups = 0
+    pending = []
+    deleted = 0
+    async for group in duplicates:
+        groups += 1
+        pending.extend(group["ids"][1:])
+        if len(pending) >= args.batch_size:
+            deleted += await _delete_drafts(pending, args.dry_run)
+            pending = []
+    deleted += await _delete_drafts(pending, args.dry_run)
+    verb = "Would delete" if args.dry_run else "Deleted"
+    print(f"{verb} {deleted} duplicate drafts across {groups} (user_id, week) pairs")
+    if args.dry_run:
+        return 0
+
+    # Swap the old non-unique (user_id, week) index for the unique one
+    for name, info in (await database.db["draftteam"].index_information()).items():
+        if info["key"] == [("user_id", 1), ("week", 1)] and not info.get("unique"):
+            await database.db["draftteam"].drop_index(name)
+    errors = await database.ensure_indexes({"draftteam": INDEXES["draftteam"]})
+    # Rebuild even if the index failed, so the boards stop counting deleted drafts
+    if deleted:
+        await leaderboards.rebuild()
+        print("Leaderboards rebuilt")
+    if errors:
+        print(errors["draftteam"])
+        return 1
+    return 0
+
+
+async def _delete_drafts(ids, dry_run):
+    if not ids or dry_run:
+        return len(ids)
+    result = await database.db["draftteam"].delete_many({"_id": {"$in": ids}})
+    return result.deleted_count
+
+
+async def validate_drafts(args):
+    """Check every draft in a week against that week's roster rules"""
+    await player_table.load()
+    await calendar.load()
+    rules = calendar.roster_rules(args.week)
+    n_players = len(player_table.costs)
+    checked = invalid = 0
+
+    async def check(batch):
+        nonlocal checked, invalid
+        squads = [np.fromiter((player_table.index.get(pid, -1) for pid in d.get("player_ids", [])), dtype=np.int64) for d in batch]
+        known = np.fromiter(((s >= 0).all() for s in squads), dtype=bool, count=len(squads))
+        ok = np.zeros(len(batch), dtype=bool)
+        idx = np.nonzero(known)[0]
+        if len(idx):
+            ok[idx] = rules.check_many([squads[i] for i in idx], player_table.role_codes, player_table.team_codes, n_players)
+        for i in np.nonzero(~ok)[0]:
+            if invalid < args.show:
+                d = batch[i]
+                reasons = rules.check(squads[i], player_table.role_codes, player_table.team_codes) if known[i] else ["Unknown player"]
+                print(f"{d['_id']} user={d.get('user_id')}: {'; '.join(reasons)}")
+            invalid += 1
+        checked += len(batch)
+
+    batch = []
+    async for d in database.db["draftteam"].find({"week": args.week}, {"user_id": 1, "player_ids": 1}).batch_size(args.batch_size):
+        batch.append(d)
+        if len(batch) >= args.batch_size:
+            await check(batch)
+            batch = []
+    if batch:
+        await check(batch)
+    print(f"Week {args.week}: {invalid}/{checked} drafts break the roster rules")
+    return 1 if invalid else 0
+
+
+async def run(args):
+    database.connect()
+    try:
+        return await args.func(args)
+    finally:
+        database.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MLBB Fantasy League maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rebuild-leaderboard", help="Recompute materialized leaderboards from draftteam")
+    p.set_defaults(func=rebuild_leaderboard)
+
+    p = sub.add_parser("check-leaderboard", help="Diff materialized leaderboards against the live aggregation")
+    p.add_argument("--show", type=int, default=20, help="Number of mismatches to print")
+    p.set_defaults(func=check_leaderboard)
+
+    p = sub.add_parser("ensure-indexes", help="Create the indexes declared in schemas.INDEXES")
+    p.set_defaults(func=ensure_indexes)
+
+    p = sub.add_parser("index-report", help="List declared indexes that are missing and undeclared extras")
+    p.set_defaults(func=index_report)
+
+    p = sub.add_parser("score-week", help="Recompute DraftTeam.points for a matchweek from player stats")
+    p.add_argument("week", type=int)
+    p.add_argument("--batch-size", type=int, default=10000, help="Drafts scored and written per bulk batch")
+    p.set_defaults(func=score_week)
+
+    p = sub.add_parser("dedupe-drafts", help="Delete duplicate drafts per (user_id, week) and enforce the unique index")
+    p.add_argument("--batch-size", type=int, default=1000, help="Draft ids deleted per delete_many")
+    p.add_argument("--dry-run", action="store_true", help="Only count the duplicates")
+    p.set_defaults(func=dedupe_drafts)
+
+    p = sub.add_parser("validate-drafts", help="Check every draft in a matchweek against its roster rules")
+    p.add_argument("week", type=int)
+    p.add_argument("--batch-size", type=int, default=10000, help="Drafts checked per vectorized batch")
+    p.add_argument("--show", type=int, default=20, help="Number of invalid drafts to print")
+    p.set_defaults(func=validate_drafts)
+
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
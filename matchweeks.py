@@ -0,0 +1,128 @@
+"""
+Matchweek Calendar
+
+In-memory copy of the small `matchweek` collection, so draft and transfer
+writes can enforce lock times without an extra query. A week is closed once
+its lock_time has passed, and every week before the current one is closed.
+Each week's roster rule overrides are kept alongside. The calendar reloads
+when weeks are written (locally or via the change-stream watcher) and again as
+each upcoming lock_time passes, picking up whichever week has been made
+current since. Without a change stream (a standalone server) another worker's
+writes would never arrive, so the calendar also reloads every
+MATCHWEEK_REFRESH_SECONDS (default 60, 0 disables), and knows() reloads on a
+miss so a week created elsewhere is accepted immediately.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from database import get_documents
+from roster import CompiledRules, rules_for
+
+RULE_FIELDS = ("squad_size", "max_per_team", "required_roles")
+REFRESH_SECONDS = float(os.getenv("MATCHWEEK_REFRESH_SECONDS", "60"))
+# Minimum age of the calendar before an unknown week triggers a reload
+MISS_RELOAD_SECONDS = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Mongo hands back naive datetimes that are UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class MatchweekCalendar:
+    def __init__(self):
+        self.lock_times: Dict[int, Optional[datetime]] = {}
+        self.rules: Dict[int, dict] = {}
+        self.current: Optional[int] = None
+        self.version = 0
+        self.loaded_at: Optional[datetime] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Held so the running reload isn't garbage-collected mid-flight
+        self._reload_task: Optional[asyncio.Task] = None
+        self._miss_lock = asyncio.Lock()
+
+    async def load(self, change: Optional[dict] = None):
+        docs = await get_documents("matchweek", {}, projection={"week": 1, "is_current": 1, "lock_time": 1, **{f: 1 for f in RULE_FIELDS}})
+        self.lock_times = {d["week"]: _utc(d.get("lock_time")) for d in docs}
+        self.rules = {d["week"]: {f: d[f] for f in RULE_FIELDS if d.get(f) is not None} for d in docs}
+        self.version += 1
+        current = [d["week"] for d in docs if d.get("is_current")]
+        self.current = max(current) if current else None
+        self.loaded_at = datetime.now(timezone.utc)
+        self.schedule_reload()
+
+    def schedule_reload(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = datetime.now(timezone.utc)
+        delays = [(t - now).total_seconds() for t in self.lock_times.values() if t is not None and t > now]
+        if REFRESH_SECONDS > 0:
+            delays.append(REFRESH_SECONDS)
+        if not delays:
+            return
+        loop = asyncio.get_running_loop()
+        delay = min(delays)
+        self._timer = loop.call_later(delay, self._start_reload)
+
+    def _start_reload(self):
+        self._timer = None
+        self._reload_task = asyncio.get_running_loop().create_task(self._reload())
+
+    async def _reload(self):
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Matchweek calendar reload failed")
+            # Keep the periodic refresh going until the database is back
+            self.schedule_reload()
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            self._reload_task = None
+
+    def is_known(self, week: int) -> bool:
+        # With no weeks configured at all, every week is accepted; a calendar
+        # that never loaded knows nothing, so knows() retries the load
+        return (self.loaded_at is not None and not self.lock_times) or week in self.lock_times
+
+    async def knows(self, week: int) -> bool:
+        """is_known, reloading once from the database on a miss"""
+        if self.is_known(week):
+            return True
+        async with self._miss_lock:
+            stale = self.loaded_at is None or (datetime.now(timezone.utc) - self.loaded_at).total_seconds() >= MISS_RELOAD_SECONDS
+            if not self.is_known(week) and stale:
+                await self._reload()
+        return self.is_known(week)
+
+    def is_locked(self, week: int, now: Optional[datetime] = None) -> bool:
+        if self.current is not None and week < self.current:
+            return True
+        lock_time = self.lock_times.get(week)
+        return lock_time is not None and (now or datetime.now(timezone.utc)) >= lock_time
+
+    def roster_rules(self, week: int) -> CompiledRules:
+        return rules_for(week, self.rules.get(week), self.version)
+
+    def stats(self) -> dict:
+        return {
+            "weeks": len(self.lock_times),
+            "current": self.current,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+        }
+
+
+calendar = MatchweekCalendar()
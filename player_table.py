@@ -0,0 +1,135 @@
+"""
+Player Lookup Table
+
+Array-backed id -> cost / role / team table for the whole roster, loaded once at
+startup and reloaded whenever players are written. Budget checks read costs
+from NumPy arrays instead of querying `player` on every draft or transfer; ids
+the table has not seen yet are fetched with one `$in` query and appended.
+Without a change stream (a standalone server) writes made through another
+worker never arrive, so the table also reloads every
+PLAYER_TABLE_REFRESH_SECONDS (default 60, 0 disables).
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, get_args
+
+import numpy as np
+from bson import ObjectId
+
+from database import get_documents
+from schemas import Role
+
+ROLES: List[str] = list(get_args(Role))
+_PROJECTION = {"cost": 1, "role": 1, "team": 1}
+REFRESH_SECONDS = float(os.getenv("PLAYER_TABLE_REFRESH_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerTable:
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.costs = np.zeros(0, dtype=np.int32)
+        self.role_codes = np.zeros(0, dtype=np.int8)
+        self.team_codes = np.zeros(0, dtype=np.int16)
+        self.teams: List[str] = []
+        self.version = 0
+        self.loaded_at: Optional[datetime] = None
+        self.hits = 0
+        self.misses = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Held so the running reload isn't garbage-collected mid-flight
+        self._reload_task: Optional[asyncio.Task] = None
+
+    def _columns(self, docs: List[dict], teams: Dict[str, int]):
+        costs = np.fromiter((d.get("cost", 0) for d in docs), dtype=np.int32, count=len(docs))
+        role_codes = np.fromiter((ROLES.index(d["role"]) if d.get("role") in ROLES else -1 for d in docs), dtype=np.int8, count=len(docs))
+        team_codes = np.fromiter((teams.setdefault(d.get("team", ""), len(teams)) for d in docs), dtype=np.int16, count=len(docs))
+        return costs, role_codes, team_codes
+
+    async def load(self):
+        """Replace the table with the current contents of `player`"""
+        docs = await get_documents("player", {}, projection=_PROJECTION)
+        teams: Dict[str, int] = {}
+        costs, role_codes, team_codes = self._columns(docs, teams)
+        # No awaits below, so readers never see a half-built table
+        self.index = {str(d["_id"]): i for i, d in enumerate(docs)}
+        self.costs, self.role_codes, self.team_codes = costs, role_codes, team_codes
+        self.teams = sorted(teams, key=teams.get)
+        self.version += 1
+        self.loaded_at = datetime.now(timezone.utc)
+        self.schedule_reload()
+
+    def schedule_reload(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if REFRESH_SECONDS > 0:
+            self._timer = asyncio.get_running_loop().call_later(REFRESH_SECONDS, self._start_reload)
+
+    def _start_reload(self):
+        self._timer = None
+        self._reload_task = asyncio.get_running_loop().create_task(self._reload())
+
+    async def _reload(self):
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Player table reload failed")
+            # Keep the periodic refresh going until the database is back
+            self.schedule_reload()
+
+    def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            self._reload_task = None
+
+    async def _fetch(self, player_ids: List[str]):
+        ids = [ObjectId(pid) for pid in player_ids if ObjectId.is_valid(pid)]
+        if not ids:
+            return
+        docs = await get_documents("player", {"_id": {"$in": ids}}, projection=_PROJECTION)
+        docs = [d for d in docs if str(d["_id"]) not in self.index]
+        if not docs:
+            return
+        teams = {t: i for i, t in enumerate(self.teams)}
+        costs, role_codes, team_codes = self._columns(docs, teams)
+        start = len(self.costs)
+        self.costs = np.concatenate([self.costs, costs])
+        self.role_codes = np.concatenate([self.role_codes, role_codes])
+        self.team_codes = np.concatenate([self.team_codes, team_codes])
+        self.teams = sorted(teams, key=teams.get)
+        for i, d in enumerate(docs):
+            self.index[str(d["_id"])] = start + i
+
+    async def rows(self, player_ids: Iterable[str]) -> np.ndarray:
+        """Row numbers for player_ids, -1 for ids that exist in neither the table nor the DB"""
+        player_ids = list(player_ids)
+        missing = [pid for pid in player_ids if pid not in self.index]
+        self.hits += len(player_ids) - len(missing)
+        if missing:
+            self.misses += len(missing)
+            await self._fetch(missing)
+        return np.fromiter((self.index.get(pid, -1) for pid in player_ids), dtype=np.int64, count=len(player_ids))
+
+    def total_cost(self, rows: np.ndarray) -> int:
+        return int(self.costs[rows].sum())
+
+    def stats(self) -> dict:
+        return {
+            "players": len(self.index),
+            "teams": len(self.teams),
+            "version": self.version,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+player_table = PlayerTable()
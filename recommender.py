@@ -0,0 +1,139 @@
+"""
+Lineup Recommender
+
+Best-projected squad under a budget that satisfies a week's roster rules.
+Projected points come from the scoring engine's player weights. The search is
+a branch-and-bound over players sorted by projected points; its bound is an
+exact budget knapsack table (best points for s more players from the rest of
+the list within b budget), built with NumPy in one backward pass. Team caps and
+role coverage are checked as players are picked. The search is pure Python,
+so recommend() runs it in a worker thread to keep the event loop serving.
+"""
+
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from database import get_documents
+from player_table import ROLES
+from roster import RosterRules
+from scoring import STAT_FIELDS, player_points, stats_matrix
+
+# Safety valve for pathological rosters; the best squad found so far is returned,
+# flagged as not proven optimal
+MAX_NODES = 500000
+
+
+class SearchLimitReached(Exception):
+    """The node cap was hit before any valid squad was found"""
+
+
+def _knapsack_bound(points: np.ndarray, costs: np.ndarray, slots: int, budget: int) -> np.ndarray:
+    """bound[i, s, b]: best points from exactly s players in i.. costing at most b"""
+    n = len(points)
+    bound = np.full((n + 1, slots + 1, budget + 1), -np.inf)
+    bound[:, 0, :] = 0.0
+    for i in range(n - 1, -1, -1):
+        bound[i] = bound[i + 1]
+        c = int(costs[i])
+        if c <= budget:
+            take = bound[i + 1, :-1, :budget + 1 - c] + points[i]
+            np.maximum(bound[i, 1:, c:], take, out=bound[i, 1:, c:])
+    return bound
+
+
+def solve(points: np.ndarray, costs: np.ndarray, role_codes: np.ndarray, team_codes: np.ndarray, rules: RosterRules, budget: int) -> Tuple[Optional[List[int]], bool]:
+    """(indices of the best valid squad or None when no squad fits, whether the search finished).
+
+    When the search stops at MAX_NODES the squad is the best found so far and
+    the flag is False. Raises SearchLimitReached if it stopped without any
+    squad, since that says nothing about whether one fits.
+    """
+    order = np.argsort(-points, kind="stable")
+    p, c, r, t = points[order], costs[order], role_codes[order], team_codes[order]
+    n, k = len(p), rules.squad_size
+    if n < k or budget < 0:
+        return None, True
+    # Budget beyond the k priciest players never binds; clipping keeps the table small
+    budget = min(budget, int(np.sort(c)[-k:].sum()) if k else 0)
+    bound = _knapsack_bound(p, c, k, budget)
+    if bound[0, k, budget] == -np.inf:
+        return None, True
+
+    need = np.zeros(len(ROLES), dtype=np.int64)
+    for role in rules.required_roles:
+        need[ROLES.index(role)] += 1
+    team_counts = np.zeros(int(t.max()) + 1 if n else 1, dtype=np.int64)
+    picked: List[int] = []
+    best = {"points": -np.inf, "squad": None}
+    nodes = 0
+
+    def search(i: int, slots: int, left: int, total: float, missing: int):
+        nonlocal nodes
+        if slots == 0:
+            if missing == 0 and total > best["points"]:
+                best["points"], best["squad"] = total, list(picked)
+            return
+        for j in range(i, n - slots + 1):
+            nodes += 1
+            if nodes > MAX_NODES:
+                return
+            cj = int(c[j])
+            if cj > left or total + p[j] + bound[j + 1, slots - 1, left - cj] <= best["points"]:
+                continue
+            tj, rj = t[j], r[j]
+            if team_counts[tj] >= rules.max_per_team:
+                continue
+            fills = int(rj >= 0 and need[rj] > 0)
+            if missing - fills > slots - 1:
+                continue
+            team_counts[tj] += 1
+            if fills:
+                need[rj] -= 1
+            picked.append(j)
+            search(j + 1, slots - 1, left - cj, total + p[j], missing - fills)
+            picked.pop()
+            if fills:
+                need[rj] += 1
+            team_counts[tj] -= 1
+
+    search(0, k, budget, 0.0, int(need.sum()))
+    finished = nodes <= MAX_NODES
+    if best["squad"] is None:
+        if not finished:
+            raise SearchLimitReached(f"No squad found within {MAX_NODES} search nodes")
+        return None, True
+    return [int(order[j]) for j in best["squad"]], finished
+
+
+async def recommend(rules: RosterRules, budget: int) -> Optional[dict]:
+    """Load the roster and return the recommended lineup with its projected points.
+
+    Returns None when no squad fits; SearchLimitReached from solve() propagates.
+    """
+    docs = await get_documents("player", {}, projection={"ign": 1, "team": 1, "role": 1, "cost": 1, **{f: 1 for f in STAT_FIELDS}})
+    if not docs:
+        return None
+    teams: Dict[str, int] = {}
+    points = player_points(stats_matrix(docs))
+    costs = np.fromiter((d.get("cost", 0) for d in docs), dtype=np.int64, count=len(docs))
+    role_codes = np.fromiter((ROLES.index(d["role"]) if d.get("role") in ROLES else -1 for d in docs), dtype=np.int64, count=len(docs))
+    team_codes = np.fromiter((teams.setdefault(d.get("team", ""), len(teams)) for d in docs), dtype=np.int64, count=len(docs))
+
+    squad, optimal = await asyncio.to_thread(solve, points, costs, role_codes, team_codes, rules, budget)
+    if squad is None:
+        return None
+    players = [
+        {"id": str(docs[i]["_id"]), "ign": docs[i].get("ign"), "team": docs[i].get("team"), "role": docs[i].get("role"),
+         "cost": int(costs[i]), "projected_points": round(float(points[i]), 2)}
+        for i in squad
+    ]
+    return {
+        "budget": budget,
+        "total_cost": int(costs[squad].sum()),
+        "projected_points": round(float(points[squad].sum()), 2),
+        # False when the node cap cut the search short
+        "optimal": optimal,
+        "players": players,
+    }
@@ -0,0 +1,104 @@
+"""
+Roster Rules
+
+Squad constraints (size, no duplicate players, a cap on players from one MPL
+team, required roles) compiled once per matchweek into NumPy count vectors and
+checked against the row numbers of the cached player table. A single squad
+check is a handful of bincounts; check_many() validates a whole batch of drafts
+with one bincount per rule.
+
+Defaults come from the environment and can be overridden per matchweek through
+the squad_size / max_per_team / required_roles fields on Matchweek:
+
+    ROSTER_SQUAD_SIZE (default 5), ROSTER_MAX_PER_TEAM (default 2),
+    ROSTER_REQUIRED_ROLES (comma-separated roles, default none)
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from player_table import ROLES
+
+SQUAD_SIZE = int(os.getenv("ROSTER_SQUAD_SIZE", "5"))
+MAX_PER_TEAM = int(os.getenv("ROSTER_MAX_PER_TEAM", "2"))
+REQUIRED_ROLES = tuple(r.strip() for r in os.getenv("ROSTER_REQUIRED_ROLES", "").split(",") if r.strip())
+# Fail at import rather than on every draft: an unknown role would raise from ROLES.index()
+_unknown_roles = sorted(set(REQUIRED_ROLES) - set(ROLES))
+if _unknown_roles:
+    raise ValueError(f"ROSTER_REQUIRED_ROLES has unknown roles {', '.join(_unknown_roles)}; expected any of {', '.join(ROLES)}")
+
+
+@dataclass(frozen=True)
+class RosterRules:
+    squad_size: int = SQUAD_SIZE
+    max_per_team: int = MAX_PER_TEAM
+    required_roles: Tuple[str, ...] = REQUIRED_ROLES
+
+
+class CompiledRules:
+    def __init__(self, rules: RosterRules):
+        self.rules = rules
+        self.role_minimums = np.zeros(len(ROLES), dtype=np.int64)
+        for role in rules.required_roles:
+            self.role_minimums[ROLES.index(role)] += 1
+
+    def _missing_roles(self, counts: np.ndarray) -> List[str]:
+        return [ROLES[i] for i in np.nonzero(counts < self.role_minimums)[0]]
+
+    def check(self, rows: np.ndarray, role_codes: np.ndarray, team_codes: np.ndarray) -> List[str]:
+        """Violations for one squad given as player table rows; empty when valid"""
+        violations = []
+        if len(rows) != self.rules.squad_size:
+            violations.append(f"Squad must have {self.rules.squad_size} players")
+        if len(np.unique(rows)) != len(rows):
+            violations.append("Duplicate player in squad")
+        if len(rows) and np.bincount(team_codes[rows]).max() > self.rules.max_per_team:
+            violations.append(f"At most {self.rules.max_per_team} players from one team")
+        if self.rules.required_roles:
+            roles = role_codes[rows]
+            missing = self._missing_roles(np.bincount(roles[roles >= 0], minlength=len(ROLES)))
+            if missing:
+                violations.append(f"Missing roles: {', '.join(missing)}")
+        return violations
+
+    def check_many(self, squads: Sequence[np.ndarray], role_codes: np.ndarray, team_codes: np.ndarray, n_players: int) -> np.ndarray:
+        """Validity of many squads at once as a boolean array"""
+        n = len(squads)
+        lengths = np.fromiter((len(s) for s in squads), dtype=np.int64, count=n)
+        flat = np.concatenate(squads).astype(np.int64) if n else np.zeros(0, dtype=np.int64)
+        owner = np.repeat(np.arange(n), lengths)
+        ok = lengths == self.rules.squad_size
+
+        distinct = np.bincount(np.unique(owner * n_players + flat) // n_players, minlength=n)
+        ok &= distinct == lengths
+
+        n_teams = int(team_codes.max()) + 1 if len(team_codes) else 1
+        per_team = np.bincount(owner * n_teams + team_codes[flat], minlength=n * n_teams).reshape(n, n_teams)
+        ok &= per_team.max(axis=1, initial=0) <= self.rules.max_per_team
+
+        if self.rules.required_roles:
+            roles = role_codes[flat]
+            known = roles >= 0
+            per_role = np.bincount(owner[known] * len(ROLES) + roles[known], minlength=n * len(ROLES)).reshape(n, len(ROLES))
+            ok &= (per_role >= self.role_minimums).all(axis=1)
+        return ok
+
+
+_compiled: Dict[Tuple[int, int], CompiledRules] = {}
+
+
+def rules_for(week: int, overrides: Optional[dict], version: int) -> CompiledRules:
+    """Compiled rules for a week, built once per calendar version"""
+    compiled = _compiled.get((week, version))
+    if compiled is None:
+        overrides = dict(overrides or {})
+        if "required_roles" in overrides:
+            overrides["required_roles"] = tuple(overrides["required_roles"])
+        compiled = CompiledRules(RosterRules(**overrides))
+        if len(_compiled) > 256:
+            _compiled.clear()
+        _compiled[(week, version)] = compiled
+    return compiled
@@ -66,6 +66,9 @@ class Notification(BaseModel):
     title: str
     message: str
     type: Literal["match", "points", "league", "system"] = "system"
+    audience: Literal["global", "league", "user"] = "global"
+    user_id: Optional[str] = Field(None, description="Recipient when audience is 'user'")
+    league_id: Optional[str] = Field(None, description="Target league when audience is 'league'")
     created_at: Optional[datetime] = None
 
 class Matchweek(BaseModel):
@@ -73,5 +76,46 @@ class Matchweek(BaseModel):
     name: str
     is_current: bool = False
     lock_time: Optional[datetime] = None
+    # Roster rule overrides for this week; unset fields use the defaults in roster.py
+    squad_size: Optional[int] = Field(None, ge=1)
+    max_per_team: Optional[int] = Field(None, ge=1)
+    required_roles: Optional[List[Role]] = None
+
+# Indexes backing the API's query paths, keyed by collection name. Each entry is
+# (keys, options) in the form accepted by create_index; every index is named so
+# the index manager in database.py can diff the declared set against the server.
+INDEXES = {
+    "user": [
+        ([("email", 1)], {"name": "email_1", "unique": True}),
+    ],
+    "player": [
+        ([("role", 1), ("team", 1)], {"name": "role_1_team_1"}),
+        ([("team", 1)], {"name": "team_1"}),
+        # Bulk imports upsert on ign; drop an older non-unique ign_1 and resolve duplicate igns first
+        ([("ign", 1)], {"name": "ign_1", "unique": True}),
+    ],
+    "draftteam": [
+        # One draft per user per week; run `manage.py dedupe-drafts` on older data first
+        ([("user_id", 1), ("week", 1)], {"name": "user_id_1_week_1", "unique": True}),
+        ([("week", 1), ("points", -1)], {"name": "week_1_points_-1"}),
+    ],
+    "league": [
+        ([("code", 1)], {"name": "code_1", "unique": True}),
+    ],
+    "notification": [
+        ([("audience", 1), ("_id", -1)], {"name": "audience_1__id_-1"}),
+    ],
+    "inbox": [
+        ([("user_id", 1), ("_id", -1)], {"name": "user_id_1__id_-1"}),
+    ],
+    "leaderboard_weekly": [
+        ([("user_id", 1), ("week", 1)], {"name": "user_id_1_week_1", "unique": True}),
+        ([("week", 1), ("points", -1), ("user_id", 1)], {"name": "week_1_points_-1_user_id_1"}),
+    ],
+    "leaderboard_season": [
+        ([("user_id", 1)], {"name": "user_id_1", "unique": True}),
+        ([("points", -1), ("user_id", 1)], {"name": "points_-1_user_id_1"}),
+    ],
+}
 
 # Note: The database helper will use these models for validation in the app.
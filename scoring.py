@@ -0,0 +1,97 @@
+"""
+Fantasy Points Scoring
+
+Player points are a weighted sum of the stat fields on Player, computed for the
+whole roster at once with NumPy. A draft scores the sum of its players' points;
+every draft in a week is rolled up in batches and written back with unordered
+bulk updates, together with the matching leaderboard deltas.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+
+import database
+import leaderboards
+from database import get_documents
+
+# Points per unit of each Player stat field
+WEIGHTS = {
+    "kda": 2.0,
+    "damage": 0.001,
+    "objectives": 1.0,
+    "win_rate": 0.1,
+    "mvp_count": 5.0,
+}
+STAT_FIELDS = tuple(WEIGHTS)
+WEIGHT_VECTOR = np.array([WEIGHTS[f] for f in STAT_FIELDS], dtype=np.float64)
+
+
+def player_points(stats: np.ndarray) -> np.ndarray:
+    """Points for a (n_players, len(STAT_FIELDS)) stats matrix"""
+    return stats @ WEIGHT_VECTOR
+
+
+def stats_matrix(docs: Sequence[dict]) -> np.ndarray:
+    rows = [[d.get(f) or 0 for f in STAT_FIELDS] for d in docs]
+    return np.array(rows, dtype=np.float64).reshape(len(rows), len(STAT_FIELDS))
+
+
+async def load_roster() -> Tuple[Dict[str, int], np.ndarray]:
+    """Return (player id -> row, points per row) with one trailing zero row for unknown ids"""
+    docs = await get_documents("player", {}, projection={f: 1 for f in STAT_FIELDS})
+    index = {str(d["_id"]): i for i, d in enumerate(docs)}
+    return index, np.append(player_points(stats_matrix(docs)), 0.0)
+
+
+def draft_points(points: np.ndarray, index: Dict[str, int], squads: Sequence[List[str]]) -> np.ndarray:
+    """Sum player points per squad; ids missing from index score zero"""
+    unknown = len(points) - 1
+    lengths = np.fromiter((len(s) for s in squads), dtype=np.int64, count=len(squads))
+    flat = np.fromiter((index.get(pid, unknown) for s in squads for pid in s), dtype=np.int64, count=int(lengths.sum()))
+    owner = np.repeat(np.arange(len(squads)), lengths)
+    totals = np.bincount(owner, weights=points[flat], minlength=len(squads))
+    return np.rint(totals).astype(np.int64)
+
+
+async def score_week(week: int, batch_size: int = 10000) -> dict:
+    """Recompute DraftTeam.points for every draft in week and propagate the deltas"""
+    if database.db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    started = time.perf_counter()
+    index, points = await load_roster()
+    summary = {"week": week, "drafts": 0, "updated": 0}
+
+    async def flush(drafts: List[dict]):
+        new_points = draft_points(points, index, [d.get("player_ids", []) for d in drafts])
+        old_points = np.fromiter((d.get("points", 0) for d in drafts), dtype=np.int64, count=len(drafts))
+        changed = np.nonzero(new_points != old_points)[0]
+        summary["drafts"] += len(drafts)
+        if not len(changed):
+            return
+        now = datetime.now(timezone.utc)
+        await database.db["draftteam"].bulk_write([
+            UpdateOne({"_id": drafts[i]["_id"]}, {"$set": {"points": int(new_points[i]), "updated_at": now}})
+            for i in changed
+        ], ordered=False)
+        await leaderboards.apply_points_deltas(
+            (drafts[i]["user_id"], week, int(new_points[i] - old_points[i])) for i in changed
+        )
+        summary["updated"] += len(changed)
+
+    batch = []
+    cursor = database.db["draftteam"].find({"week": week}, {"user_id": 1, "player_ids": 1, "points": 1}).batch_size(batch_size)
+    async for d in cursor:
+        batch.append(d)
+        if len(batch) >= batch_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
@@ -0,0 +1,97 @@
+"""
+Password Hashing
+
+scrypt hashes computed in a bounded process pool so key derivation never runs on
+the event loop or in Starlette's threadpool. Encoded hashes carry their own cost
+parameters (scrypt$n$r$p$salt$hash), so the cost can be raised later and old
+hashes are upgraded on the next successful login. Rows that predate hashing
+hold the plaintext password and are recognised by the missing prefix.
+
+    SCRYPT_N, SCRYPT_R, SCRYPT_P   cost parameters (default 2**14, 8, 1)
+    AUTH_HASH_WORKERS              pool processes (default: CPU count)
+    AUTH_HASH_MAX_PENDING          hashes queued or running before callers wait
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+SCRYPT_N = int(os.getenv("SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("SCRYPT_P", "1"))
+HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "0")) or os.cpu_count() or 1
+MAX_PENDING = int(os.getenv("AUTH_HASH_MAX_PENDING", "0")) or HASH_WORKERS * 4
+
+PREFIX = "scrypt$"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+
+def _hash(password: str, n: int, r: int, p: int) -> str:
+    salt = os.urandom(16)
+    return f"{PREFIX}{n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def _verify(password: str, encoded: str) -> bool:
+    try:
+        n, r, p, salt, expected = encoded[len(PREFIX):].split("$")
+        derived = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(derived, base64.b64decode(expected))
+
+
+def start():
+    """Start the hashing pool; called from the app lifespan"""
+    global _pool, _slots
+    if _pool is None:
+        # forkserver, not fork: by now Motor and PyMongo threads are running, and
+        # forking a threaded process can leave children deadlocked on their locks
+        _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+        _slots = asyncio.Semaphore(MAX_PENDING)
+
+
+def shutdown():
+    global _pool, _slots
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+    _slots = None
+
+
+async def _run(fn, *args):
+    loop = asyncio.get_running_loop()
+    if _pool is None:
+        return await loop.run_in_executor(None, fn, *args)
+    async with _slots:
+        return await loop.run_in_executor(_pool, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+async def verify_password(password: str, encoded: str) -> bool:
+    if not encoded.startswith(PREFIX):
+        # Legacy plaintext row
+        return hmac.compare_digest(password.encode("utf-8"), encoded.encode("utf-8"))
+    return await _run(_verify, password, encoded)
+
+
+def needs_rehash(encoded: str) -> bool:
+    """True for plaintext rows and hashes made with different cost parameters"""
+    return not encoded.startswith(f"{PREFIX}{SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
@@ -0,0 +1,55 @@
+"""
+JSON Serialization
+
+A single orjson-based encoder for API responses. orjson serializes datetime,
+dict and list natively; default() covers the BSON types Mongo hands back, so
+endpoints can return raw documents without converting ObjectIds by hand. Mongo
+returns naive UTC datetimes, which are emitted with a trailing "Z".
+"""
+
+import base64
+
+import orjson
+from bson import Binary, Decimal128, ObjectId
+from bson.timestamp import Timestamp
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return str(obj.to_decimal())
+    if isinstance(obj, Timestamp):
+        return obj.as_datetime()
+    if isinstance(obj, (Binary, bytes)):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=default, option=OPTIONS)
+
+
+def with_public_id(doc: dict) -> dict:
+    """Expose Mongo's _id as `id`; the encoder turns the ObjectId into a string"""
+    doc["id"] = doc.pop("_id")
+    return doc
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with the shared encoder.
+
+    Return an instance directly from an endpoint to skip FastAPI's
+    jsonable_encoder pass over raw documents.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,42 @@
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+from cache import CACHES
+from matchweeks import calendar
+from player_table import player_table
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """An in-memory Motor stand-in installed as `database.db`, with fresh in-process tables"""
+    mock = AsyncMongoMockClient()["fantasy_test"]
+    monkeypatch.setattr(database, "db", mock)
+    # The player table and calendar are process-wide singletons; start each test empty
+    player_table.__init__()
+    calendar.__init__()
+    yield mock
+    calendar.close()
+    player_table.close()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """A TestClient running the app lifespan against the in-memory database"""
+    import main
+
+    # mongomock has no change streams
+    monkeypatch.setenv("CHANGE_STREAMS", "0")
+    for c in CACHES.values():
+        c.invalidate()
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def make_player(ign: str, team: str, role: str, cost: int = 10, **stats) -> dict:
+    return {
+        "name": ign.title(), "ign": ign, "team": team, "role": role, "cost": cost,
+        "kda": 3.0, "damage": 1000, "objectives": 2, "win_rate": 50.0, "mvp_count": 0, "photo_url": None,
+        **stats,
+    }
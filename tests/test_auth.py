@@ -0,0 +1,38 @@
+import main
+import security
+
+
+def test_register_login_logout(client):
+    r = client.post("/auth/register", json={"username": "alice", "email": "alice@example.com", "password": "pw"})
+    assert r.status_code == 200
+    r = client.post("/auth/login", json={"email": "alice@example.com", "password": "pw"})
+    assert r.status_code == 200
+    token = r.json()["token"]
+    assert client.post("/auth/login", json={"email": "alice@example.com", "password": "nope"}).status_code == 401
+    assert client.post("/auth/logout", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_invalid_registration_is_rejected_before_hashing(client, monkeypatch):
+    hashed = []
+
+    async def hash_password(password):
+        hashed.append(password)
+        return "scrypt$unused"
+
+    monkeypatch.setattr(security, "hash_password", hash_password)
+    assert client.post("/auth/register", json={"username": "alice", "email": "bad", "password": "pw"}).status_code == 422
+    assert client.post("/auth/register", json={"username": "al", "email": "al@example.com", "password": "pw"}).status_code == 422
+    assert hashed == []
+
+
+def test_registration_race_on_email_is_a_400(client, monkeypatch):
+    body = {"username": "alice", "email": "alice@example.com", "password": "pw"}
+    assert client.post("/auth/register", json=body).status_code == 200
+
+    # The duplicate check passes for both racers; the unique index decides
+    async def no_existing_user(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(main, "find_one", no_existing_user)
+    r = client.post("/auth/register", json=body)
+    assert r.status_code == 400 and r.json()["detail"] == "Email already registered"
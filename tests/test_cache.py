@@ -0,0 +1,74 @@
+import gzip
+
+import cache
+from cache import CachedBody, TTLCache, etag_matches
+from conftest import make_player
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    c = TTLCache("test-expiry", ttl=10)
+    c.set("k", "v")
+    assert c.get("k") == "v"
+    now[0] += 11
+    assert c.get("k") is None
+    assert (c.hits, c.misses, c.evictions) == (1, 1, 1)
+
+
+def test_lru_eviction_keeps_recently_read():
+    c = TTLCache("test-lru", ttl=60, maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert (c.get("a"), c.get("b"), c.get("c")) == (1, None, 3)
+
+
+def test_invalidate_drops_entries_and_racing_fills():
+    c = TTLCache("test-invalidate", ttl=60)
+    c.set("a", 1)
+    version = c.version
+    c.invalidate()
+    assert c.get("a") is None
+    # A fill that started before the invalidation must not land
+    c.set("a", "stale", version)
+    assert c.get("a") is None
+    c.set("a", "fresh", c.version)
+    assert c.get("a") == "fresh"
+
+
+def test_etag_matches():
+    body = CachedBody(b"[]")
+    assert body.etag.startswith('W/"')
+    assert etag_matches(body.etag, body.etag)
+    assert etag_matches(body.etag[2:], body.etag)
+    assert etag_matches(f'"nope", {body.etag}', body.etag)
+    assert etag_matches("*", body.etag)
+    assert not etag_matches('"nope"', body.etag)
+    assert not etag_matches(None, body.etag)
+
+
+def test_cached_body_compresses_once():
+    body = CachedBody(b"x" * 4096)
+    gz = body.encoded("gzip")
+    assert gzip.decompress(gz) == body.body
+    assert body.encoded("gzip") is gz
+    assert CachedBody(b"[]").encoded("gzip") is None
+
+
+def test_players_etag_and_304(client):
+    r = client.post("/players", json=make_player("alpha", "A", "tank"))
+    assert r.status_code == 200
+    first = client.get("/players")
+    etag = first.headers["etag"]
+    assert [p["ign"] for p in first.json()] == ["alpha"]
+
+    cached = client.get("/players", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["etag"] == etag
+
+    client.post("/players", json=make_player("bravo", "B", "mage"))
+    changed = client.get("/players", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert len(changed.json()) == 2
+    assert [p["ign"] for p in client.get("/players", params={"role": "mage"}).json()] == ["bravo"]
@@ -0,0 +1,78 @@
+import gzip
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from compression import CompressionMiddleware, negotiate
+
+BIG = {"players": [{"ign": f"player{i}", "cost": i} for i in range(200)]}
+
+
+async def big(request):
+    return JSONResponse(BIG)
+
+
+async def small(request):
+    return JSONResponse({"ok": True})
+
+
+async def precompressed(request):
+    return Response(gzip.compress(b'{"cached": true}'), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+
+async def binary(request):
+    return Response(b"\x00" * 4096, media_type="application/octet-stream")
+
+
+async def stream(request):
+    async def lines():
+        for i in range(100):
+            yield f'{{"row": {i}}}\n'.encode()
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+app = Starlette(routes=[Route("/big", big), Route("/small", small), Route("/pre", precompressed), Route("/bin", binary), Route("/stream", stream)])
+app.add_middleware(CompressionMiddleware, minimum_size=512)
+client = TestClient(app)
+
+
+def test_negotiate():
+    assert negotiate(None) is None
+    assert negotiate("gzip") == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("identity") is None
+
+
+def test_large_json_is_gzipped():
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in r.headers["vary"]
+    assert int(r.headers["content-length"]) < len(JSONResponse(BIG).body)
+    assert r.json() == BIG
+
+
+def test_client_without_accept_encoding_gets_identity():
+    r = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in r.headers
+    assert r.json() == BIG
+
+
+def test_small_and_binary_bodies_pass_through():
+    for path in ("/small", "/bin"):
+        r = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in r.headers
+
+
+def test_precompressed_body_is_not_encoded_twice():
+    r = client.get("/pre", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.json() == {"cached": True}
+
+
+def test_streaming_response_is_compressed_incrementally():
+    r = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert "content-length" not in r.headers
+    assert r.text.splitlines() == [f'{{"row": {i}}}' for i in range(100)]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+import main
+from conftest import make_player
+
+
+async def _players(db):
+    players = [make_player(f"p{i}", team, role) for i, (team, role) in enumerate(
+        [("A", "tank"), ("A", "mage"), ("B", "marksman"), ("B", "support"), ("C", "assassin"), ("C", "fighter")])]
+    return [str(i) for i in (await db["player"].insert_many(players)).inserted_ids]
+
+
+def test_redraft_updates_the_same_row(db):
+    async def scenario():
+        ids = await _players(db)
+        first = await main.create_draft(main.DraftRequest(user_id="u1", week=1, player_ids=ids[:5]), auth_user_id="u1")
+        await db["draftteam"].update_one({}, {"$set": {"points": 7}})
+        second = await main.create_draft(main.DraftRequest(user_id="u1", week=1, player_ids=ids[1:]), auth_user_id="u1")
+        assert first == second
+        drafts = await db["draftteam"].find({}).to_list(None)
+        assert len(drafts) == 1
+        assert (drafts[0]["player_ids"], drafts[0]["points"], drafts[0]["version"]) == (ids[1:], 7, 2)
+
+    asyncio.run(scenario())
+
+
+def _lose_insert_race(monkeypatch, db, losses):
+    """Make the next `losses` upserts fail as if a concurrent request inserted first"""
+    collection_type = type(db["draftteam"])
+    upsert = collection_type.find_one_and_update
+    calls = []
+
+    async def racing(self, filter, update, *args, **kwargs):
+        calls.append(filter)
+        if len(calls) <= losses:
+            if len(calls) == 1:
+                await self.insert_one({**filter, "player_ids": [], "points": 0, "version": 1})
+            raise DuplicateKeyError("E11000 duplicate key error")
+        return await upsert(self, filter, update, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "find_one_and_update", racing)
+    return calls
+
+
+def test_lost_insert_race_retries_onto_the_winning_row(db, monkeypatch):
+    async def scenario():
+        ids = await _players(db)
+        calls = _lose_insert_race(monkeypatch, db, losses=1)
+        draft_id = await main.create_draft(main.DraftRequest(user_id="u1", week=1, player_ids=ids[:5]), auth_user_id="u1")
+        assert len(calls) == 2
+        drafts = await db["draftteam"].find({}).to_list(None)
+        assert [str(d["_id"]) for d in drafts] == [draft_id]
+        assert drafts[0]["player_ids"] == ids[:5] and drafts[0]["version"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_second_duplicate_key_error_propagates(db, monkeypatch):
+    async def scenario():
+        ids = await _players(db)
+        _lose_insert_race(monkeypatch, db, losses=2)
+        with pytest.raises(DuplicateKeyError):
+            await main.create_draft(main.DraftRequest(user_id="u1", week=1, player_ids=ids[:5]), auth_user_id="u1")
+
+    asyncio.run(scenario())
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+import ingest
+from ingest import RecordError, iter_records
+
+
+def collect(content_type, *chunks):
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def run():
+        return [(row, record) async for row, record in iter_records(content_type, body())]
+
+    return asyncio.run(run())
+
+
+def test_ndjson_lines_split_across_chunks():
+    records = collect("application/x-ndjson", b'{"ign": "a"}\n{"ig', b'n": "b"}\n\n{"ign": "c"}')
+    assert records == [(1, {"ign": "a"}), (2, {"ign": "b"}), (3, {"ign": "c"})]
+
+
+def test_ndjson_bad_line_is_reported_in_place():
+    records = collect("application/x-ndjson; charset=utf-8", b'{"ign": "a"}\nnot json\n{"ign": "c"}\n')
+    assert records[0] == (1, {"ign": "a"})
+    assert records[1][0] == 2 and isinstance(records[1][1], RecordError)
+    assert records[2] == (3, {"ign": "c"})
+
+
+def test_ndjson_invalid_utf8_is_a_row_error():
+    records = collect("application/x-ndjson", b'{"ign": "a"}\n{"ign": "\xff"}\n{"ign": "\xc3\xa9"}\n')
+    assert records[0] == (1, {"ign": "a"})
+    assert records[1][0] == 2 and str(records[1][1]) == "Invalid UTF-8"
+    assert records[2] == (3, {"ign": "é"})
+
+
+def test_csv_drops_empty_cells_and_flags_short_rows():
+    records = collect("text/csv", b"ign, team ,photo_url\r\na,RRQ,\r\n", b"b,EVOS,http://x\r\nc,ONIC\r\n")
+    assert records[0] == (1, {"ign": "a", "team": "RRQ"})
+    assert records[1] == (2, {"ign": "b", "team": "EVOS", "photo_url": "http://x"})
+    row, error = records[2]
+    assert row == 3 and isinstance(error, RecordError)
+
+
+def test_csv_quoted_comma():
+    assert collect("text/csv", b'ign,name\na,"Doe, Jane"\n') == [(1, {"ign": "a", "name": "Doe, Jane"})]
+
+
+def test_csv_quoted_newline_stays_in_one_record():
+    records = collect("text/csv", b'name,ign,team\n"Foo\n', b'Bar",b,T\nBaz,c,T\n')
+    assert records == [(1, {"name": "Foo\nBar", "ign": "b", "team": "T"}), (2, {"name": "Baz", "ign": "c", "team": "T"})]
+
+
+def test_csv_unterminated_quote_is_reported():
+    records = collect("text/csv", b'name,ign\nA,a\n"B,b\n')
+    assert records[0] == (1, {"name": "A", "ign": "a"})
+    assert records[1][0] == 2 and isinstance(records[1][1], RecordError)
+
+
+def test_csv_runaway_quote_fails_the_import(monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_RECORD_LINES", 3)
+    with pytest.raises(RecordError):
+        collect("text/csv", b'name,ign\n"A\nb\nc\nd\ne\n')
+
+
+def test_csv_malformed_quoting_is_a_row_error():
+    records = collect("text/csv", b'name,ign\n"A"x,a\nB,b\n')
+    assert records[0][0] == 1 and isinstance(records[0][1], RecordError)
+    assert records[1] == (2, {"name": "B", "ign": "b"})
+
+
+def test_csv_bom_and_invalid_utf8():
+    records = collect("text/csv", b"\xef\xbb\xbfname,ign\nA,a\nB\xff,b\n")
+    assert records[0] == (1, {"name": "A", "ign": "a"})
+    assert records[1][0] == 2 and str(records[1][1]) == "Invalid UTF-8"
+
+
+def test_json_array_is_default():
+    assert collect(None, b'[{"ign": "a"}, ', b'{"ign": "b"}]') == [(1, {"ign": "a"}), (2, {"ign": "b"})]
+    assert collect("application/json") == []
+
+
+@pytest.mark.parametrize("body", [b"{not json", b'{"ign": "a"}', b'[{"ign": "\xff"}]'])
+def test_invalid_json_body_raises(body):
+    with pytest.raises(RecordError):
+        collect("application/json", body)
@@ -0,0 +1,58 @@
+import asyncio
+
+import leaderboards
+from leaderboards import SEASON, WEEKLY
+
+
+def seed_season(db, points):
+    asyncio.run(db[SEASON].insert_many([{"user_id": u, "points": p} for u, p in points.items()]))
+
+
+def test_rank_of_with_ties_and_neighbours(db):
+    seed_season(db, {"a": 50, "b": 40, "c": 40, "d": 40, "e": 10})
+    r = asyncio.run(leaderboards.rank_of("c", k=2))
+    assert (r["points"], r["rank"], r["position"]) == (40, 2, 3)
+    assert [(n["user_id"], n["position"]) for n in r["above"]] == [("a", 1), ("b", 2)]
+    assert [(n["user_id"], n["position"]) for n in r["below"]] == [("d", 4), ("e", 5)]
+    assert asyncio.run(leaderboards.rank_of("missing")) is None
+
+
+def test_rank_of_weekly_board(db):
+    asyncio.run(db[WEEKLY].insert_many([
+        {"user_id": "a", "week": 1, "points": 5}, {"user_id": "b", "week": 1, "points": 9}, {"user_id": "a", "week": 2, "points": 99},
+    ]))
+    r = asyncio.run(leaderboards.rank_of("a", week=1, k=5))
+    assert (r["rank"], [n["user_id"] for n in r["above"]], r["below"]) == (2, ["b"], [])
+
+
+def test_for_users_ranks_members_only(db):
+    seed_season(db, {"a": 50, "b": 40, "c": 40, "outsider": 100})
+    rows = asyncio.run(leaderboards.for_users(["c", "b", "a", "new", "b"]))
+    assert [(r["user_id"], r["points"], r["rank"]) for r in rows] == [("a", 50, 1), ("b", 40, 2), ("c", 40, 2), ("new", 0, 4)]
+
+
+def test_deltas_rebuild_and_consistency(db):
+    async def scenario():
+        await db["draftteam"].insert_many([
+            {"user_id": "a", "week": 1, "points": 10}, {"user_id": "a", "week": 2, "points": 5}, {"user_id": "b", "week": 1, "points": 7},
+        ])
+        # First start on a database that predates the stores
+        assert await leaderboards.ensure_built() is True
+        assert await leaderboards.check_consistency() == []
+        assert await leaderboards.ensure_built() is False
+
+        # Points written without a delta are reported
+        await db["draftteam"].update_one({"user_id": "b"}, {"$set": {"points": 9}})
+        mismatches = await leaderboards.check_consistency()
+        assert {(m["board"], m["expected"], m["actual"]) for m in mismatches} == {(WEEKLY, 9, 7), (SEASON, 9, 7)}
+
+        await leaderboards.apply_points_deltas([("b", 1, 2)])
+        assert await leaderboards.check_consistency() == []
+        top = await leaderboards.top()
+        assert [(r["user_id"], r["points"]) for r in top] == [("a", 15), ("b", 9)]
+
+    asyncio.run(scenario())
+
+
+def test_ensure_built_skips_empty_database(db):
+    assert asyncio.run(leaderboards.ensure_built()) is False
@@ -0,0 +1,23 @@
+import tokens
+
+
+def auth(user_id):
+    return {"Authorization": f"Bearer {tokens.issue(user_id)}"}
+
+
+def test_league_owner_comes_from_the_token(client):
+    assert client.post("/leagues", json={"name": "L"}).status_code == 401
+    assert client.post("/leagues", json={"name": "L", "owner_user_id": "victim"}, headers=auth("mallory")).status_code == 403
+
+    league_id = client.post("/leagues", json={"name": "L"}, headers=auth("u1")).json()
+    league = client.get(f"/leagues/{league_id}").json()
+    assert (league["owner_user_id"], league["member_user_ids"]) == ("u1", ["u1"])
+    assert client.post("/leagues", json={"name": "L2", "owner_user_id": "u1"}, headers=auth("u1")).status_code == 200
+
+
+def test_join_requires_matching_token(client):
+    league_id = client.post("/leagues", json={"name": "L"}, headers=auth("u1")).json()
+    code = client.get(f"/leagues/{league_id}").json()["code"]
+    assert client.post("/leagues/join", params={"code": code, "user_id": "u2"}, headers=auth("u3")).status_code == 403
+    assert client.post("/leagues/join", params={"code": code, "user_id": "u2"}, headers=auth("u2")).status_code == 200
+    assert client.get(f"/leagues/{league_id}").json()["member_user_ids"] == ["u1", "u2"]
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import matchweeks
+from matchweeks import MatchweekCalendar
+
+NOW = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+
+def test_is_locked_by_lock_time_and_current_week(db):
+    async def scenario():
+        await db["matchweek"].insert_many([
+            {"week": 1, "name": "W1", "lock_time": NOW - timedelta(days=7)},
+            {"week": 2, "name": "W2", "is_current": True},
+            {"week": 3, "name": "W3", "lock_time": NOW + timedelta(days=7)},
+        ])
+        cal = MatchweekCalendar()
+        await cal.load()
+        cal.current = 2
+        assert cal.is_locked(1, NOW)
+        assert not cal.is_locked(2, NOW)
+        assert not cal.is_locked(3, NOW)
+        assert cal.is_locked(3, NOW + timedelta(days=8))
+        cal.close()
+
+    asyncio.run(scenario())
+
+
+def test_knows_reloads_once_on_a_miss(db, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(matchweeks, "MISS_RELOAD_SECONDS", 0)
+        await db["matchweek"].insert_one({"week": 1, "name": "W1"})
+        cal = MatchweekCalendar()
+        await cal.load()
+        assert await cal.knows(1)
+        # Created by another worker: unknown in memory until the miss reloads
+        await db["matchweek"].insert_one({"week": 2, "name": "W2"})
+        assert not cal.is_known(2)
+        assert await cal.knows(2)
+        assert not await cal.knows(9)
+        cal.close()
+
+    asyncio.run(scenario())
+
+
+def test_knows_rate_limits_reloads(db):
+    async def scenario():
+        await db["matchweek"].insert_one({"week": 1, "name": "W1"})
+        cal = MatchweekCalendar()
+        await cal.load()
+        version = cal.version
+        assert not await cal.knows(9)
+        assert cal.version == version
+        cal.close()
+
+    asyncio.run(scenario())
+
+
+def test_never_loaded_calendar_retries_instead_of_accepting_everything(db):
+    async def scenario():
+        cal = MatchweekCalendar()
+        assert not cal.is_known(5)
+        await db["matchweek"].insert_one({"week": 1, "name": "W1"})
+        assert not await cal.knows(5)
+        assert await cal.knows(1)
+        cal.close()
+
+    asyncio.run(scenario())
+
+
+def test_periodic_refresh_picks_up_new_weeks(db, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(matchweeks, "REFRESH_SECONDS", 0.05)
+        cal = MatchweekCalendar()
+        await cal.load()
+        await db["matchweek"].insert_one({"week": 4, "name": "W4"})
+        await asyncio.sleep(0.2)
+        assert cal.is_known(4) and cal.version >= 2
+        assert cal._reload_task is not None
+        cal.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import asyncio
+
+import tokens
+
+
+def auth(user_id):
+    return {"Authorization": f"Bearer {tokens.issue(user_id)}"}
+
+
+def post(client, title, **fields):
+    r = client.post("/notifications", json={"title": title, "message": "m", **fields})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_global_league_and_user_notifications_merge_newest_first(client, db):
+    league_id = str(asyncio.run(db["league"].insert_one({"name": "L", "code": "C0DE", "owner_user_id": "u1", "member_user_ids": ["u1", "u2"]})).inserted_id)
+    post(client, "g1")
+    post(client, "to-u1", audience="user", user_id="u1")
+    post(client, "league", audience="league", league_id=league_id)
+    post(client, "to-u3", audience="user", user_id="u3")
+    post(client, "g2")
+
+    anonymous = [n["title"] for n in client.get("/notifications").json()]
+    assert anonymous == ["g2", "g1"]
+    u1 = [n["title"] for n in client.get("/notifications", headers=auth("u1")).json()]
+    assert u1 == ["g2", "league", "to-u1", "g1"]
+    u2 = [n["title"] for n in client.get("/notifications", headers=auth("u2")).json()]
+    assert u2 == ["g2", "league", "g1"]
+
+
+def test_cursor_paging(client):
+    for i in range(5):
+        post(client, f"n{i}")
+    first = client.get("/notifications", params={"limit": 2})
+    assert [n["title"] for n in first.json()] == ["n4", "n3"]
+    cursor = first.headers["x-next-cursor"]
+    assert cursor == first.json()[-1]["id"]
+
+    second = client.get("/notifications", params={"limit": 2, "before": cursor})
+    assert [n["title"] for n in second.json()] == ["n2", "n1"]
+    last = client.get("/notifications", params={"limit": 2, "before": second.headers["x-next-cursor"]})
+    assert [n["title"] for n in last.json()] == ["n0"]
+    assert "x-next-cursor" not in last.headers
+
+    newer = client.get("/notifications", params={"since": second.json()[0]["id"]})
+    assert [n["title"] for n in newer.json()] == ["n4", "n3"]
+
+
+def test_targeted_notifications_need_a_target(client):
+    assert client.post("/notifications", json={"title": "t", "message": "m", "audience": "user"}).status_code == 400
+    assert client.post("/notifications", json={"title": "t", "message": "m", "audience": "league"}).status_code == 400
+    missing = "0" * 24
+    assert client.post("/notifications", json={"title": "t", "message": "m", "audience": "league", "league_id": missing}).status_code == 404
@@ -0,0 +1,35 @@
+import asyncio
+
+import player_table as player_table_module
+from conftest import make_player
+from player_table import PlayerTable
+
+
+def test_rows_fetch_unseen_ids_and_flag_unknown(db):
+    async def scenario():
+        table = PlayerTable()
+        await table.load()
+        ids = [str(i) for i in (await db["player"].insert_many([make_player("a", "A", "tank", cost=7), make_player("b", "B", "mage", cost=9)])).inserted_ids]
+        rows = await table.rows([ids[1], "0" * 24, ids[0], "not-an-id"])
+        assert rows.tolist()[1] == -1 and rows.tolist()[3] == -1
+        assert table.total_cost(rows[[0, 2]]) == 16
+        assert sorted(table.teams) == ["A", "B"]
+        table.close()
+
+    asyncio.run(scenario())
+
+
+def test_periodic_refresh_picks_up_other_workers_writes(db, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(player_table_module, "REFRESH_SECONDS", 0.05)
+        pid = (await db["player"].insert_one(make_player("a", "A", "tank", cost=7))).inserted_id
+        table = PlayerTable()
+        await table.load()
+        # Written by another worker, with no change stream to report it
+        await db["player"].update_one({"_id": pid}, {"$set": {"cost": 12}})
+        await asyncio.sleep(0.2)
+        assert table.total_cost(await table.rows([str(pid)])) == 12
+        assert table.version >= 2
+        table.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+import asyncio
+
+from conftest import make_player
+
+HEADER = b"name,ign,team,role,cost,kda,damage,objectives,win_rate\n"
+
+
+def test_bulk_import_only_updates_supplied_fields(client, db):
+    asyncio.run(db["player"].insert_one(make_player("alpha", "A", "tank", mvp_count=4, photo_url="http://img/alpha")))
+    body = HEADER + b"Alpha,alpha,A,tank,12,5.5,2000,3,60\nBravo,bravo,B,mage,8,4,1500,1,55\n"
+    r = client.post("/players/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    assert (r.json()["matched"], r.json()["upserted"], r.json()["failed"]) == (1, 1, 0)
+
+    alpha = asyncio.run(db["player"].find_one({"ign": "alpha"}))
+    assert (alpha["cost"], alpha["kda"]) == (12, 5.5)
+    assert (alpha["mvp_count"], alpha["photo_url"]) == (4, "http://img/alpha")
+    bravo = asyncio.run(db["player"].find_one({"ign": "bravo"}))
+    assert (bravo["mvp_count"], bravo["photo_url"]) == (0, None)
+    assert bravo["created_at"] is not None
+
+
+def test_bulk_import_keeps_multiline_names_whole(client, db):
+    body = HEADER + b'"Foo\nBar",b,T,tank,5,1,1,1,50\n'
+    r = client.post("/players/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert (r.json()["upserted"], r.json()["failed"]) == (1, 0)
+    names = [p["name"] for p in asyncio.run(db["player"].find({}).to_list(None))]
+    assert names == ["Foo\nBar"]
+
+
+def test_bulk_import_reports_bad_rows_and_accepts_a_bom(client, db):
+    body = b"\xef\xbb\xbf" + HEADER + b"A\xff,a,T,tank,5,1,1,1,50\nB,b,T,tank,0,1,1,1,50\nC,c,T,tank,5,1,1,1,50\n"
+    r = client.post("/players/bulk", content=body, headers={"Content-Type": "text/csv"})
+    assert r.status_code == 200
+    result = r.json()
+    assert (result["upserted"], result["failed"]) == (1, 2)
+    assert [e["row"] for e in result["errors"]] == [1, 2]
+
+
+def test_bulk_import_rejects_unparseable_json(client):
+    r = client.post("/players/bulk", content=b"{", headers={"Content-Type": "application/json"})
+    assert r.status_code == 400
@@ -0,0 +1,97 @@
+import asyncio
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+import recommender
+from conftest import make_player
+from main import recommendations_cache
+from player_table import ROLES
+from roster import RosterRules
+
+
+def brute_force(points, costs, role_codes, team_codes, rules, budget):
+    need = {ROLES.index(r): rules.required_roles.count(r) for r in set(rules.required_roles)}
+    best = None
+    for squad in combinations(range(len(points)), rules.squad_size):
+        squad = list(squad)
+        if costs[squad].sum() > budget:
+            continue
+        if np.bincount(team_codes[squad]).max() > rules.max_per_team:
+            continue
+        if any((role_codes[squad] == role).sum() < n for role, n in need.items()):
+            continue
+        total = points[squad].sum()
+        if best is None or total > best:
+            best = total
+    return best
+
+
+def random_roster(rng, n):
+    points = rng.uniform(0, 50, n)
+    costs = rng.integers(5, 30, n)
+    role_codes = rng.integers(0, 5, n)
+    team_codes = rng.integers(0, 4, n)
+    return points, costs, role_codes, team_codes
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_solve_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    points, costs, role_codes, team_codes = random_roster(rng, 16)
+    rules = RosterRules(squad_size=5, max_per_team=2, required_roles=(ROLES[0], ROLES[1]))
+    budget = int(rng.integers(60, 110))
+
+    squad, optimal = recommender.solve(points, costs, role_codes, team_codes, rules, budget)
+    assert optimal
+    expected = brute_force(points, costs, role_codes, team_codes, rules, budget)
+    if expected is None:
+        assert squad is None
+        return
+    assert squad is not None and len(set(squad)) == 5
+    assert costs[squad].sum() <= budget
+    assert np.bincount(team_codes[squad]).max() <= 2
+    assert points[squad].sum() == pytest.approx(expected)
+
+
+def test_solve_returns_none_when_nothing_fits():
+    points = np.array([10.0, 9.0, 8.0])
+    costs = np.array([50, 50, 50])
+    zeros = np.zeros(3, dtype=np.int64)
+    assert recommender.solve(points, costs, zeros, np.arange(3), RosterRules(squad_size=2, max_per_team=1, required_roles=()), 60) == (None, True)
+
+
+def test_solve_raises_when_node_cap_hit_before_any_squad(monkeypatch):
+    monkeypatch.setattr(recommender, "MAX_NODES", 1)
+    rng = np.random.default_rng(0)
+    points, costs, role_codes, team_codes = random_roster(rng, 16)
+    rules = RosterRules(squad_size=5, max_per_team=2, required_roles=())
+    with pytest.raises(recommender.SearchLimitReached):
+        recommender.solve(points, costs, role_codes, team_codes, rules, 1000)
+
+
+def test_solve_flags_a_capped_search_as_not_optimal(monkeypatch):
+    monkeypatch.setattr(recommender, "MAX_NODES", 10)
+    rng = np.random.default_rng(0)
+    points, costs, role_codes, team_codes = random_roster(rng, 16)
+    rules = RosterRules(squad_size=5, max_per_team=2, required_roles=())
+    squad, optimal = recommender.solve(points, costs, role_codes, team_codes, rules, 1000)
+    assert squad is not None and len(squad) == 5
+    assert not optimal
+
+
+def test_capped_recommendations_are_not_cached(client, db, monkeypatch):
+    teams = "AABBCCDD"
+    asyncio.run(db["player"].insert_many([make_player(f"p{i}", teams[i], "tank", kda=i) for i in range(8)]))
+    client.post("/weeks", json={"week": 1, "name": "W1"})
+
+    monkeypatch.setattr(recommender, "MAX_NODES", 10)
+    r = client.get("/draft/recommend", params={"week": 1})
+    assert r.status_code == 200 and r.json()["optimal"] is False
+    assert recommendations_cache.stats()["size"] == 0
+
+    monkeypatch.setattr(recommender, "MAX_NODES", 500000)
+    r = client.get("/draft/recommend", params={"week": 1})
+    assert r.json()["optimal"] is True
+    assert recommendations_cache.stats()["size"] == 1
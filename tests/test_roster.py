@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from player_table import ROLES
+from roster import CompiledRules, RosterRules
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Rows 0-5: two players each from teams 0, 1 and 2
+ROLE_CODES = np.array([ROLES.index(r) for r in ("tank", "mage", "marksman", "support", "assassin", "fighter")], dtype=np.int8)
+TEAM_CODES = np.array([0, 0, 1, 1, 2, 2], dtype=np.int16)
+
+
+def rules(**overrides) -> CompiledRules:
+    return CompiledRules(RosterRules(**{"squad_size": 4, "max_per_team": 2, "required_roles": (), **overrides}))
+
+
+def test_check_accepts_valid_squad():
+    assert rules().check(np.array([0, 1, 2, 4]), ROLE_CODES, TEAM_CODES) == []
+
+
+def test_check_reports_each_violation():
+    compiled = rules(max_per_team=1, required_roles=("tank", "roamer"))
+    violations = compiled.check(np.array([0, 0, 1]), ROLE_CODES, TEAM_CODES)
+    assert violations == [
+        "Squad must have 4 players",
+        "Duplicate player in squad",
+        "At most 1 players from one team",
+        "Missing roles: roamer",
+    ]
+
+
+def test_check_many_matches_check():
+    compiled = rules(required_roles=("tank",))
+    squads = [
+        np.array([0, 1, 2, 4]),     # valid
+        np.array([0, 2, 4]),        # too small
+        np.array([0, 0, 2, 4]),     # duplicate
+        np.array([1, 2, 3, 4]),     # no tank
+        np.array([0, 1, 2, 3, 4]),  # too big
+        np.array([0, 2, 3, 5]),     # valid
+    ]
+    ok = compiled.check_many(squads, ROLE_CODES, TEAM_CODES, len(ROLE_CODES))
+    assert ok.tolist() == [not compiled.check(s, ROLE_CODES, TEAM_CODES) for s in squads]
+    assert ok.tolist() == [True, False, False, False, False, True]
+
+
+def test_check_many_team_cap():
+    team_codes = np.array([0, 0, 0, 1, 1, 2], dtype=np.int16)
+    ok = rules().check_many([np.array([0, 1, 2, 3]), np.array([0, 1, 3, 5])], ROLE_CODES, team_codes, len(team_codes))
+    assert ok.tolist() == [False, True]
+
+
+def test_check_many_empty_batch():
+    assert rules().check_many([], ROLE_CODES, TEAM_CODES, len(ROLE_CODES)).tolist() == []
+
+
+def test_unknown_required_role_fails_at_import():
+    env = {**os.environ, "ROSTER_REQUIRED_ROLES": "tank,tnak"}
+    result = subprocess.run([sys.executable, "-c", "import roster"], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "ROSTER_REQUIRED_ROLES has unknown roles tnak" in result.stderr
+
+    env["ROSTER_REQUIRED_ROLES"] = "tank, mage"
+    assert subprocess.run([sys.executable, "-c", "import roster"], cwd=ROOT, env=env).returncode == 0
@@ -0,0 +1,44 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import leaderboards
+import scoring
+from conftest import make_player
+
+
+def test_player_points_uses_weights():
+    stats = scoring.stats_matrix([{"kda": 2, "damage": 1000, "objectives": 3, "win_rate": 50, "mvp_count": 1}, {}])
+    expected = 2 * 2.0 + 1000 * 0.001 + 3 * 1.0 + 50 * 0.1 + 1 * 5.0
+    assert scoring.player_points(stats).tolist() == pytest.approx([expected, 0.0])
+
+
+def test_draft_points_sums_squads_and_ignores_unknown_ids():
+    index = {"a": 0, "b": 1, "c": 2}
+    points = np.array([10.4, 5.3, 1.0, 0.0])  # trailing zero row for unknown ids
+    totals = scoring.draft_points(points, index, [["a", "b"], ["c", "zzz"], [], ["a", "a", "c"]])
+    assert totals.tolist() == [16, 1, 0, 22]
+
+
+def test_score_week_updates_changed_drafts_and_boards(db):
+    async def scenario():
+        ids = (await db["player"].insert_many([
+            make_player("alpha", "A", "tank", kda=5, damage=0, objectives=0, win_rate=0, mvp_count=0),
+            make_player("bravo", "B", "mage", kda=0, damage=0, objectives=10, win_rate=0, mvp_count=0),
+        ])).inserted_ids
+        a, b = str(ids[0]), str(ids[1])
+        await db["draftteam"].insert_many([
+            {"user_id": "u1", "week": 3, "player_ids": [a, b], "points": 0},
+            {"user_id": "u2", "week": 3, "player_ids": [b], "points": 10},
+            {"user_id": "u3", "week": 4, "player_ids": [a], "points": 0},
+        ])
+        await leaderboards.rebuild()
+
+        summary = await scoring.score_week(3, batch_size=1)
+        assert (summary["drafts"], summary["updated"]) == (2, 1)
+        drafts = {d["user_id"]: d["points"] async for d in db["draftteam"].find({})}
+        assert drafts == {"u1": 20, "u2": 10, "u3": 0}
+        assert await leaderboards.check_consistency() == []
+
+    asyncio.run(scenario())
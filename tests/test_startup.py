@@ -0,0 +1,27 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import database
+import main
+from player_table import player_table
+
+
+def test_unreachable_database_skips_startup_work(db, monkeypatch):
+    async def unreachable(timeout):
+        return False
+
+    async def fail(*args, **kwargs):
+        raise AssertionError("startup touched an unreachable database")
+
+    monkeypatch.setattr(database, "ping", unreachable)
+    monkeypatch.setattr(database, "ensure_indexes", fail)
+    monkeypatch.setattr(player_table, "load", fail)
+    monkeypatch.setenv("CHANGE_STREAMS", "0")
+    with TestClient(main.app) as client:
+        assert client.get("/").status_code == 200
+        assert player_table._timer is not None
+
+
+def test_ping(db):
+    assert asyncio.run(database.ping(1.0)) is True
@@ -0,0 +1,51 @@
+import base64
+
+import pytest
+
+import tokens
+
+
+def test_issue_and_verify_round_trip():
+    claims = tokens.verify(tokens.issue("user-1"))
+    assert claims["sub"] == "user-1"
+    assert claims["exp"] > claims["iat"]
+
+
+def test_tampered_payload_is_rejected():
+    payload, signature = tokens.issue("user-1").split(".")
+    forged = base64.urlsafe_b64encode(b'{"sub":"admin","exp":9999999999}').rstrip(b"=").decode()
+    with pytest.raises(tokens.InvalidToken, match="Bad signature"):
+        tokens.verify(f"{forged}.{signature}")
+
+
+@pytest.mark.parametrize("token", ["", "no-dot", "abc.", ".abc", "a.b.c"])
+def test_malformed_tokens_are_rejected(token):
+    with pytest.raises(tokens.InvalidToken):
+        tokens.verify(token)
+
+
+@pytest.mark.parametrize("where", ["payload", "signature"])
+def test_non_ascii_tokens_are_rejected(where):
+    payload, signature = tokens.issue("user-1").split(".")
+    token = f"{payload}é.{signature}" if where == "payload" else f"{payload}.{signature}é"
+    with pytest.raises(tokens.InvalidToken):
+        tokens.verify(token)
+
+
+def test_signed_non_object_payload_is_rejected():
+    payload = base64.urlsafe_b64encode(b"[1, 2]").rstrip(b"=").decode()
+    with pytest.raises(tokens.InvalidToken, match="Malformed"):
+        tokens.verify(f"{payload}.{tokens._sign(payload)}")
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(tokens, "TOKEN_TTL", -1)
+    with pytest.raises(tokens.InvalidToken, match="expired"):
+        tokens.verify(tokens.issue("user-1"))
+
+
+def test_revoked_token_is_rejected():
+    token = tokens.issue("user-1")
+    tokens.revoke(tokens.verify(token))
+    with pytest.raises(tokens.InvalidToken, match="revoked"):
+        tokens.verify(token)
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from conftest import make_player
+
+
+async def _seed(db):
+    players = [
+        make_player("alpha", "A", "tank"), make_player("bravo", "A", "mage"),
+        make_player("charlie", "B", "marksman"), make_player("delta", "B", "support"),
+        make_player("echo", "C", "assassin"), make_player("foxtrot", "C", "fighter"),
+    ]
+    result = await db["player"].insert_many(players)
+    ids = [str(i) for i in result.inserted_ids]
+    await db["draftteam"].insert_one({"user_id": "u1", "week": 1, "budget": 100, "player_ids": ids[:5], "total_cost": 50, "points": 0, "version": 1})
+    return ids
+
+
+def test_transfer_swaps_one_player(db):
+    async def scenario():
+        ids = await _seed(db)
+        req = main.TransferRequest(user_id="u1", week=1, out_player_id=ids[4], in_player_id=ids[5])
+        assert await main.make_transfer(req, auth_user_id="u1") == {"status": "ok"}
+        draft = await db["draftteam"].find_one({"user_id": "u1", "week": 1})
+        assert draft["player_ids"] == ids[:4] + [ids[5]]
+        assert draft["version"] == 2
+        assert await db["transfer"].count_documents({}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_transfers_one_wins_other_conflicts(db, monkeypatch):
+    async def scenario():
+        ids = await _seed(db)
+        # Hold both requests after they read the draft, so both validate against
+        # the same squad and race on the compare-and-swap write
+        barrier = asyncio.Barrier(2)
+        read_draft = main.find_one
+
+        async def find_one_then_wait(*args, **kwargs):
+            doc = await read_draft(*args, **kwargs)
+            await barrier.wait()
+            return doc
+
+        monkeypatch.setattr(main, "find_one", find_one_then_wait)
+        swaps = [
+            main.TransferRequest(user_id="u1", week=1, out_player_id=ids[4], in_player_id=ids[5]),
+            main.TransferRequest(user_id="u1", week=1, out_player_id=ids[3], in_player_id=ids[5]),
+        ]
+        results = await asyncio.gather(*(main.make_transfer(s, auth_user_id="u1") for s in swaps), return_exceptions=True)
+
+        ok = [i for i, r in enumerate(results) if r == {"status": "ok"}]
+        conflicts = [r for r in results if isinstance(r, HTTPException)]
+        assert len(ok) == 1
+        assert len(conflicts) == 1 and conflicts[0].status_code == 409
+
+        winner = swaps[ok[0]]
+        draft = await db["draftteam"].find_one({"user_id": "u1", "week": 1})
+        expected = [pid for pid in ids[:5] if pid != winner.out_player_id] + [winner.in_player_id]
+        assert draft["player_ids"] == expected
+        assert draft["version"] == 2
+        assert await db["transfer"].count_documents({}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_transfer_rejects_roster_violation(db):
+    async def scenario():
+        ids = await _seed(db)
+        extra = await db["player"].insert_one(make_player("golf", "A", "roamer"))
+        req = main.TransferRequest(user_id="u1", week=1, out_player_id=ids[4], in_player_id=str(extra.inserted_id))
+        with pytest.raises(HTTPException) as e:
+            await main.make_transfer(req, auth_user_id="u1")
+        assert e.value.status_code == 400
+        draft = await db["draftteam"].find_one({"user_id": "u1", "week": 1})
+        assert draft["player_ids"] == ids[:5]
+
+    asyncio.run(scenario())
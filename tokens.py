@@ -0,0 +1,88 @@
+"""
+Session Tokens
+
+Stateless signed tokens: base64url(JSON claims) + "." + base64url(HMAC-SHA256).
+Verification is pure CPU work with no database lookup; revocation is a small
+in-process LRU of token ids, so a revoked token is only refused by the worker
+that revoked it until the token expires.
+
+    AUTH_SECRET        signing key, must be identical on every worker
+    AUTH_TOKEN_TTL     token lifetime in seconds (default 7 days)
+    AUTH_REVOKED_MAX   revoked token ids remembered per worker (default 10000)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", str(7 * 24 * 3600)))
+REVOKED_MAX = int(os.getenv("AUTH_REVOKED_MAX", "10000"))
+
+_secret = os.getenv("AUTH_SECRET", "").encode("utf-8")
+if not _secret:
+    logger.warning("AUTH_SECRET is not set; using a per-process key, tokens won't verify across workers or restarts")
+    _secret = os.urandom(32)
+
+_revoked: "OrderedDict[str, int]" = OrderedDict()
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue(user_id: str) -> str:
+    """Issue a token for user_id"""
+    now = int(time.time())
+    claims = {"sub": user_id, "jti": _b64encode(os.urandom(9)), "iat": now, "exp": now + TOKEN_TTL}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify(token: str) -> dict:
+    """Return the token's claims, raising InvalidToken if it is forged, expired or revoked"""
+    # Issued tokens are pure base64url; anything else (headers arrive as latin-1)
+    # would break the ASCII encode in _sign and the str compare_digest.
+    if not token.isascii():
+        raise InvalidToken("Malformed token")
+    payload, _, signature = token.partition(".")
+    if not signature or not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidToken("Bad signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise InvalidToken("Malformed token")
+    if not isinstance(claims, dict):
+        raise InvalidToken("Malformed token")
+    if claims.get("exp", 0) <= time.time():
+        raise InvalidToken("Token expired")
+    if claims.get("jti") in _revoked:
+        raise InvalidToken("Token revoked")
+    return claims
+
+
+def revoke(claims: dict):
+    """Remember a token id as revoked until its expiry, evicting the oldest past REVOKED_MAX"""
+    _revoked[claims["jti"]] = claims["exp"]
+    _revoked.move_to_end(claims["jti"])
+    now = time.time()
+    while _revoked and (len(_revoked) > REVOKED_MAX or next(iter(_revoked.values())) <= now):
+        _revoked.popitem(last=False)